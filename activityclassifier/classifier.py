@@ -5,9 +5,11 @@ Created on Mar 19, 2017
 @author: Fisher Yu
 '''
 
+import functools
 import os
 import re
 
+import numpy as np
 import yaml
 
 RE_COMMENT = r'^([ \t]*(#|(\\\*)|(\*\*)|(//)|(/\*))|[ \t]*$)'
@@ -24,7 +26,13 @@ class BasicFileTypeClassifier:
     CG_CODE = 0
     CG_COMMENT = 1
 
-    def __init__(self):
+    # Path signals, by priority
+    __GIT = 0
+    __DOC = 1
+    __TEST = 2
+    __SOURCE = 3
+
+    def __init__(self, cache_size=65536):
         self.rules = yaml.load(open(os.path.join(os.path.dirname(__file__), 'rules.yml')).read())
 
         # List of filename extensions from GitHub Linguist
@@ -42,6 +50,39 @@ class BasicFileTypeClassifier:
                 self.reverse_extensions.setdefault(ext, set([]))
                 self.reverse_extensions[ext].add(lang)
 
+        # all the path signals in a single regex, matched at the start of the path: a lookahead per priority looks for
+        # any of its signals, from the lowest priority to the highest, so the last group found is the highest priority
+        signals = [["/.git/"], self.rules['Media']['path'] + self.rules['Doc']['path'], self.rules['Test']['path'],
+                   self.rules['Source']['path']]
+        self.__path_signals = re.compile(''.join('(?=.*?(%s))?' % BasicFileTypeClassifier.__trie_pattern(group)
+                                                 for group in reversed(signals)), re.DOTALL)
+        self.__num_priorities = len(signals)
+        self.__doc_extensions = frozenset(self.rules['Doc']['extension'])
+        self.__doc_filenames = frozenset(self.rules['Doc']['filename'])
+        self.__cached_label = functools.lru_cache(maxsize=cache_size)(self.__label)
+
+    @staticmethod
+    def __trie_pattern(words):
+        """Regex matching any of the words, with their common prefixes merged, so that it backtracks less."""
+        if not words:
+            return '(?!)'
+        tree = {}
+        for word in words:
+            node = tree
+            for char in word:
+                node = node.setdefault(char, {})
+            node[''] = {}
+
+        def pattern(node):
+            branches = [re.escape(char) + pattern(child) for char, child in sorted(node.items()) if char != '']
+            if not branches:
+                return ''
+            body = branches[0] if len(branches) == 1 else '(?:%s)' % '|'.join(branches)
+            # a word ending here is matched without the rest
+            return '(?:%s)?' % body if '' in node else body
+
+        return pattern(tree)
+
     def labelDiffLine(self, diff_line):
         # NOTE_PT = r'^([ \t]*(#|(\\\*)|(\*\*)|(//)|(/\*))|[ \t]*$)'
         # pt = re.compile(NOTE_PT)
@@ -52,34 +93,38 @@ class BasicFileTypeClassifier:
             return self.CG_CODE
 
     def labelFile(self, file_name):
+        return self.__cached_label(file_name)
+
+    def label_files(self, file_names):
+        """Labels of a list of paths, as an array."""
+        return np.fromiter((self.__cached_label(file_name) for file_name in file_names), dtype=np.int8,
+                           count=len(file_names))
+
+    def __label(self, file_name):
         base_name = os.path.basename(file_name)
         root_name, extension = os.path.splitext(base_name)
 
+        found = self.__path_signals.match(file_name).lastindex
+        priority = self.__num_priorities - found if found is not None else None
+
         # Skip .git folder
-        if file_name.find("/.git/") != -1:
+        if priority == self.__GIT:
             return -1
 
-        for signal in self.rules['Media']['path']:
-            if file_name.find(signal) != -1:
-                return self.DOC
-
-        for signal in self.rules['Doc']['path']:
-            if file_name.find(signal) != -1:
-                return self.DOC
+        if priority == self.__DOC:
+            return self.DOC
 
-        if extension in self.rules['Doc']['extension']:
+        if extension in self.__doc_extensions:
             return self.DOC
 
-        if root_name in self.rules['Doc']['filename']:
+        if root_name in self.__doc_filenames:
             return self.DOC
 
-        for signal in self.rules['Test']['path']:
-            if file_name.find(signal) != -1:
-                return self.TEST
+        if priority == self.__TEST:
+            return self.TEST
 
-        for signal in self.rules['Source']['path']:
-            if file_name.find(signal) != -1:
-                return self.SRC
+        if priority == self.__SOURCE:
+            return self.SRC
 
         # SRC extensions          
         if extension in self.reverse_extensions:
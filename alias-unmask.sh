@@ -1,4 +1,4 @@
 #!/usr/bin/env bash
 export PYTHONPATH=.:$PYTHONPATH
 echo "Unmasking aliases"
-python alias/unmask_aliases.py $1 $2
+python alias/unmask_aliases.py $1 $2 $3
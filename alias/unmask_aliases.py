@@ -58,7 +58,7 @@ def merge(a, b, rule):
             labels[a] = [rule]
 
 
-def main(input_dir_path: str, out_dir_path: str):
+def main(input_dir_path: str, out_dir_path: str, file_format: str = 'csv'):
     log.info("Input dir: %s; out_dir: %s", input_dir_path, out_dir_path)
     try:
         out_dir = os.path.abspath(out_dir_path)
@@ -102,7 +102,7 @@ def main(input_dir_path: str, out_dir_path: str):
     d_uid_login = {}
 
     #df = pd.read_csv(input_dir_path, index_col=False, na_filter=False)
-    df = utility.read_from_folder(input_dir_path, "*contributors.csv")
+    df = utility.read_from_folder(input_dir_path, "*contributors.csv", file_format=file_format)
 
     users = [SzzContributor(getattr(row, "CONTRIBUTOR_ID"), getattr(row, "NAME"), getattr(row, "EMAIL")) for row in df.itertuples(index=False)]
     log.info("Users to parse: %d", len(users))
@@ -374,4 +374,5 @@ def main(input_dir_path: str, out_dir_path: str):
 if __name__ == '__main__':
     input_file_dir = sys.argv[1]
     out_dir = sys.argv[2]
-    main(input_file_dir, out_dir)
+    input_format = sys.argv[3] if len(sys.argv) > 3 else 'csv'
+    main(input_file_dir, out_dir, input_format)
@@ -17,9 +17,10 @@ def __replace(_str):
     return _ref
 
 
-def __extract(input_dir_path: str, commit_pattern: str = "*commit*.csv", issue_pattern: str = "*comments.csv"):
+def __extract(input_dir_path: str, commit_pattern: str = "*commit*.csv", issue_pattern: str = "*comments.csv",
+              file_format: str = 'csv'):
     logger.info("Retrieving comments from commits")
-    commit_messages = utility.read_from_folder(input_dir_path, commit_pattern, ["SLUG", "MESSAGE"])
+    commit_messages = utility.read_from_folder(input_dir_path, commit_pattern, ["SLUG", "MESSAGE"], file_format)
     logger.info("Extracting cross refs from commit messages")
     cross_references = []
 
@@ -32,7 +33,7 @@ def __extract(input_dir_path: str, commit_pattern: str = "*commit*.csv", issue_p
                 cross_references.append([slug, _ref, "commit"])
 
     logger.info("Retrieving comments from issues and pull-requests")
-    issuepr_messages = utility.read_from_folder(input_dir_path, issue_pattern, ["SLUG", "BODY"])
+    issuepr_messages = utility.read_from_folder(input_dir_path, issue_pattern, ["SLUG", "BODY"], file_format)
     logger.info("Extracting cross refs from issue/PR messages")
     for ipr in issuepr_messages.itertuples():
         cross_refs = re.finditer(regex, getattr(ipr, "BODY"), re.MULTILINE)
@@ -44,20 +45,22 @@ def __extract(input_dir_path: str, commit_pattern: str = "*commit*.csv", issue_p
 
     logger.info("Saving cross references")
     df = pd.DataFrame(cross_references, columns=["SLUG", "REF", "TYPE"])
-    df.to_csv(os.path.join(input_dir_path, "cross_references.csv"), index=False)
+    utility.write_table(df, os.path.join(input_dir_path, utility.with_format("cross_references.csv", file_format)))
 
 
 if __name__ == '__main__':
     logger = initialize_logger(name="CROSS_REF")
-    help_message = 'Usage:\n extractor.py -in|--input=<input_dir> -cp|--commit_pattern=<commit_pattern_file> -ip|--issues_pattern=<issues_pattern_file>'
+    help_message = 'Usage:\n extractor.py -in|--input=<input_dir> -cp|--commit_pattern=<commit_pattern_file> -ip|--issues_pattern=<issues_pattern_file> [--format=csv|parquet]'
     input_dir = None
     commit_pattern = "*blamed_commit.csv"
     issues_pattern = "*comments.csv"
+    file_format = 'csv'
 
     try:
         if not sys.argv[1:]:
             raise getopt.GetoptError('No arguments passed from the command line. See help instructions.')
-        opts, args = getopt.getopt(sys.argv[1:], "H:in:cp:ip", ["input=", "commit_pattern=", "issues_pattern=", "help"])
+        opts, args = getopt.getopt(sys.argv[1:], "H:in:cp:ip", ["input=", "commit_pattern=", "issues_pattern=", "format=",
+                                                                      "help"])
         for opt, arg in opts:
             if opt in ("-h", "--help"):
                 print(help_message)
@@ -68,6 +71,10 @@ if __name__ == '__main__':
                 commit_pattern = arg
             elif opt in ("-ip", "--issues_pattern"):
                 issues_pattern = arg
+            elif opt == "--format":
+                if arg not in utility.FORMATS:
+                    raise getopt.GetoptError('Invalid format %s, expected one of %s.' % (arg, ', '.join(utility.FORMATS)))
+                file_format = arg
             else:
                 assert False, "unhandled option"
     except getopt.GetoptError as err:
@@ -77,7 +84,7 @@ if __name__ == '__main__':
         sys.exit(1)
 
     try:
-        __extract(input_dir, commit_pattern, issues_pattern)
+        __extract(input_dir, commit_pattern, issues_pattern, file_format)
         logger.info("Done")
     except KeyboardInterrupt:
         logger.error("Received Ctrl-C or another break signal. Exiting.")
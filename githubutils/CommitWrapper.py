@@ -1,14 +1,64 @@
-import os
 from datetime import datetime, timezone, timedelta
 import pytz
 import re
 import logging
+from typing import Sequence, Tuple
+
+import numpy as np
 
 _RE_ISSUE_ID = re.compile(r'[^a-zA-Z0-9_#/](\#\d+)\b')
 _RE2_ISSUE_ID = re.compile(r'\b(GH-\d+)\b')
+# both patterns in one, for whole messages. Matches start at '#' or 'G', which the regex engine looks for quickly, and
+# the character before '#' cannot be a line break, as a reference at the start of a line has none when the message is
+# scanned line by line
+_RE_ISSUE_REF = re.compile(r'[#G](?:(?<=[^a-zA-Z0-9_#/\n]#)|(?<=\bG)H-)(\d+)\b')
+
+# longer numbers cannot be issue ids
+MAX_ISSUE_ID = 2 ** 63
 
 logger = logging.getLogger('SZZ-COMMIT-WRAPPER')
 
+
+def scan_issue_ids(messages: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Issue references ('#123' or 'GH-123') of a list of commit messages, scanned in a single pass over the messages
+    joined together. Returns the index of the message, the line number (from 1) and the issue id of each reference,
+    sorted by message, line and id, and without repeated ids in a line.
+    """
+    text = '\n'.join(messages)
+    lines = []
+    issue_ids = []
+    line = 0
+    position = 0
+    hash_end = 0
+    for match in _RE_ISSUE_REF.finditer(text):
+        if text[match.start()] == '#':
+            # as when the character before '#' was matched: it cannot end the previous reference
+            if match.start() - 1 < hash_end:
+                continue
+            hash_end = match.end()
+        line += text.count('\n', position, match.start())
+        position = match.start()
+        issue_id = int(match.group(1))
+        if issue_id < MAX_ISSUE_ID:
+            lines.append(line)
+            issue_ids.append(issue_id)
+    lines = np.array(lines, dtype=np.int64)
+    issue_ids = np.array(issue_ids, dtype=np.int64)
+    order = np.lexsort((issue_ids, lines))
+    lines = lines[order]
+    issue_ids = issue_ids[order]
+    unique = np.ones(len(lines), dtype=bool)
+    unique[1:] = (lines[1:] != lines[:-1]) | (issue_ids[1:] != issue_ids[:-1])
+    lines = lines[unique]
+    issue_ids = issue_ids[unique]
+
+    # first line of each message in the joined text
+    first_lines = np.cumsum([0] + [message.count('\n') + 1 for message in messages[:-1]], dtype=np.int64) \
+        if len(messages) else np.zeros(0, dtype=np.int64)
+    message_indexes = np.searchsorted(first_lines, lines, side='right') - 1
+    return message_indexes, lines - first_lines[message_indexes] + 1, issue_ids
+
 class CommitWrapper:
     def __init__(self, commit):
         self.__commit = commit
@@ -43,12 +93,13 @@ class CommitWrapper:
 
     @property
     def issue_ids(self):
+        _, line_nums, issue_ids = scan_issue_ids([self.message])
         results = []
-        for (line_num, line) in enumerate(self.message.split('\n')):
-            matches = set([int(m[1:]) for m in re.findall(_RE_ISSUE_ID, line)])
-            matches.update(set([int(m[3:]) for m in re.findall(_RE2_ISSUE_ID, line)]))
-            if matches:
-                results.append((line_num + 1, sorted(matches)))
+        for line_num, issue_id in zip(line_nums.tolist(), issue_ids.tolist()):
+            if results and results[-1][0] == line_num:
+                results[-1][1].append(issue_id)
+            else:
+                results.append((line_num, [issue_id]))
         return results
 
     @property
@@ -57,42 +108,3 @@ class CommitWrapper:
 
     def diff(self, repo):
         return repo.diff(self.__commit.parents[0], self.__commit, context_lines=0)
-
-    @staticmethod
-    def get_src_changes(basic_classifier, diff):
-        src_loc_added = 0
-        src_loc_deleted = 0
-        num_src_files_touched = 0
-        src_files = []
-        all_files = []
-        for patch in diff:
-            if not patch.delta.is_binary:
-                """
-                unlike the blame part, here we look at the new files of the patch
-                as they contain both the old files that are being modified, plus
-                the new ones, just created from scratch
-                """
-                f = patch.delta.new_file
-                all_files.append(os.path.basename(f.path))
-                if basic_classifier.labelFile(f.path) != basic_classifier.DOC:  # not a doc file
-                    num_src_files_touched += 1
-                    src_files.append(os.path.basename(f.path))
-                    for hunk in patch.hunks:
-                        for hl in hunk.lines:
-                            if hl.origin == '-':
-                                src_loc_deleted += 1
-                            elif hl.origin == '+':
-                                src_loc_added += 1
-                else:
-                    logger.debug("Skipped doc file %s" % f.path)
-            else:
-                logger.debug("Skipped binary delta.")
-        if src_files:
-            src_files = ';'.join(src_files)
-        else:
-            src_files = ''
-        if all_files:
-            all_files = ';'.join(all_files)
-        else:
-            all_files = ''
-        return all_files, src_files, num_src_files_touched, src_loc_added, src_loc_deleted
@@ -20,6 +20,7 @@ import numpy as np
 from numba import jit, prange
 import pandas as pd
 import loggingcfg
+from utils import utility
 
 logger = loggingcfg.initialize_logger('SZZ-EXTRACTOR')
 
@@ -105,7 +106,7 @@ class IssuesAndCommentExtractor(BaseGitHubThreadedExtractor):
         logger.info("Issue size: {0}; remaining: {1}".format(np.size(issues), np.size(remaining_issues)))
         return self.__parse_github_pages(remaining_issues, slug, g, issue_data, comment_data)
 
-    def issues_to_csv(self, slug: str, out_dir: str):
+    def issues_to_csv(self, slug: str, out_dir: str, file_format: str = 'csv'):
         df_issue: pd.DataFrame = None
         df_comments: pd.DataFrame = None
         pid = threading.get_ident()
@@ -135,9 +136,11 @@ class IssuesAndCommentExtractor(BaseGitHubThreadedExtractor):
         finally:
             slug = slug.replace("/", "_")
             if df_issue is not None:
-                df_issue.to_csv(os.path.join(out_dir, slug + "_issues.csv"), index=False)
+                utility.write_table(df_issue, os.path.join(out_dir, utility.with_format(slug + "_issues.csv",
+                                                                                        file_format)))
             if df_comments is not None:
-                df_comments.to_csv(os.path.join(out_dir, slug + "_comments.csv"), index=False)
+                utility.write_table(df_comments, os.path.join(out_dir, utility.with_format(slug + "_comments.csv",
+                                                                                           file_format)))
 
     @staticmethod
     def __parse_comments(self, slug, issue):
@@ -176,17 +179,18 @@ class IssuesAndCommentExtractor(BaseGitHubThreadedExtractor):
 
 
 if __name__ == '__main__':
-    help_message = 'Usage:\n IssuesAndCommentsProcessor.py -s|--slug=<slug> -t|--tokens=<tokens> -o|--output=<output_dir>'
+    help_message = 'Usage:\n IssuesAndCommentsProcessor.py -s|--slug=<slug> -t|--tokens=<tokens> -o|--output=<output_dir> [-f|--format=csv|parquet]'
     slug = None
     out_dir = None
     tokens_file = None
+    file_format = 'csv'
 
     logger = initialize_logger(name="SZZ:ISSUES_COMMENTS")
 
     try:
         if not sys.argv[1:]:
             raise getopt.GetoptError('No arguments passed from the command line. See help instructions.')
-        opts, args = getopt.getopt(sys.argv[1:], "s:t:o:H", ["slug=", "output=", "tokens", "help"])
+        opts, args = getopt.getopt(sys.argv[1:], "s:t:o:f:H", ["slug=", "output=", "tokens", "format=", "help"])
         for opt, arg in opts:
             if opt in ("-h", "--help"):
                 print(help_message)
@@ -197,6 +201,10 @@ if __name__ == '__main__':
                 tokens_file = arg
             elif opt in ("-s", "--slug"):
                 slug = arg
+            elif opt in ("-f", "--format"):
+                if arg not in utility.FORMATS:
+                    raise getopt.GetoptError('Invalid format %s, expected one of %s.' % (arg, ', '.join(utility.FORMATS)))
+                file_format = arg
             else:
                 assert False, "unhandled option"
     except getopt.GetoptError as err:
@@ -219,7 +227,7 @@ if __name__ == '__main__':
     try:
         extractor = IssuesAndCommentExtractor(tokens, tokens_queue, tokens_map)
         logger.info("Beginning data extraction.")
-        extractor.issues_to_csv(slug, out_dir)
+        extractor.issues_to_csv(slug, out_dir, file_format)
         logger.info("Done.")
         exit(0)
     except KeyboardInterrupt:
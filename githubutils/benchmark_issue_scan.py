@@ -0,0 +1,88 @@
+import getopt
+import random
+import re
+import sys
+import time
+
+import pygit2
+
+from githubutils.CommitWrapper import _RE_ISSUE_ID, _RE2_ISSUE_ID, scan_issue_ids
+from loggingcfg import initialize_logger
+
+
+def per_line_issue_ids(message):
+    """The previous CommitWrapper.issue_ids: both patterns on each line of the message."""
+    results = []
+    for (line_num, line) in enumerate(message.split('\n')):
+        matches = set([int(m[1:]) for m in re.findall(_RE_ISSUE_ID, line)])
+        matches.update(set([int(m[3:]) for m in re.findall(_RE2_ISSUE_ID, line)]))
+        if matches:
+            results.append((line_num + 1, sorted(matches)))
+    return results
+
+
+def synthetic_messages(num_messages, seed=0):
+    """Short messages of a few lines, one in four referencing issues."""
+    rng = random.Random(seed)
+    words = ['fix', 'update', 'refactor', 'the', 'parser', 'for', 'tests', 'docs', 'merge', 'branch', 'release']
+    messages = []
+    for _ in range(num_messages):
+        lines = [' '.join(rng.choice(words) for _ in range(rng.randint(3, 10))) for _ in range(rng.randint(1, 4))]
+        if rng.random() < 0.25:
+            line = rng.randrange(len(lines))
+            lines[line] += rng.choice([' (#%d)', ' closes #%d', ' GH-%d', ', see #%d']) % rng.randint(1, 50000)
+        messages.append('\n'.join(lines))
+    return messages
+
+
+def repo_messages(repo_path, num_messages):
+    """Messages of the commits of a repository, repeated up to the number of messages."""
+    git_repo = pygit2.Repository(repo_path)
+    messages = [commit.message for commit in git_repo.walk(git_repo[git_repo.head.target].id)]
+    return (messages * (num_messages // max(len(messages), 1) + 1))[:num_messages]
+
+
+def start(argv):
+    num_messages = 1000000
+    repo_path = None
+    try:
+        opts, args = getopt.getopt(argv, "hn:r:", ["messages=", "repo=", "help"])
+        for opt, arg in opts:
+            if opt in ("-h", "--help"):
+                print('Usage:\n benchmark_issue_scan.py [-n|--messages=<num_messages>] [-r|--repo=<repo_path>]')
+                sys.exit(0)
+            elif opt in ("-n", "--messages"):
+                num_messages = int(arg)
+            elif opt in ("-r", "--repo"):
+                repo_path = arg
+            else:
+                assert False, "unhandled option"
+    except getopt.GetoptError as err:
+        logger.error(err)
+        print('Usage:\n benchmark_issue_scan.py [-n|--messages=<num_messages>] [-r|--repo=<repo_path>]')
+        sys.exit(1)
+
+    messages = repo_messages(repo_path, num_messages) if repo_path else synthetic_messages(num_messages)
+    logger.info("Scanning %d messages", len(messages))
+
+    begin = time.time()
+    per_line = [per_line_issue_ids(message) for message in messages]
+    per_line_time = time.time() - begin
+    logger.info("Per line regular expressions: %.2f seconds", per_line_time)
+
+    begin = time.time()
+    message_indexes, line_nums, issue_ids = scan_issue_ids(messages)
+    scan_time = time.time() - begin
+    logger.info("Single pass scanner: %.2f seconds (%.1fx)", scan_time, per_line_time / max(scan_time, 1e-9))
+
+    expected = [(i, line_num, issue_id) for i, results in enumerate(per_line)
+                for line_num, ids in results for issue_id in ids]
+    if expected != list(zip(message_indexes.tolist(), line_nums.tolist(), issue_ids.tolist())):
+        logger.error("The two scanners found different references")
+        sys.exit(1)
+    logger.info("Both found the same %d references", len(expected))
+
+
+if __name__ == '__main__':
+    logger = initialize_logger(name="SZZ-SCAN-BENCHMARK")
+    start(sys.argv[1:])
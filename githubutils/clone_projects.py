@@ -3,7 +3,7 @@ import logging
 import os
 import sys
 
-from gitutils.repo import RepoCloner
+from gitutils.repo import RepoCloner, RepoPreparer
 from loggingcfg import initialize_logger
 from utils import utility
 
@@ -12,14 +12,15 @@ def start(argv):
     project_file = 'project-list.txt'
     destination_dir = './git_repos'
     symlink_dir = None
+    prepare = False
 
     try:
         if not argv:
             raise getopt.GetoptError('No arguments passed from the command line. See help instructions.')
-        opts, args = getopt.getopt(argv, "hf:t:s:", ["from=", "to=", "symlink=", "help"])
+        opts, args = getopt.getopt(argv, "hf:t:s:p", ["from=", "to=", "symlink=", "prepare", "help"])
         for opt, arg in opts:
             if opt in ("-h", "--help"):
-                print('Usage:\n clone_projects.py -f|--from=<file> -t|--to=<dir> [-s|--symlink=<dir>]')
+                print('Usage:\n clone_projects.py -f|--from=<file> -t|--to=<dir> [-s|--symlink=<dir>] [-p|--prepare]')
                 sys.exit(0)
             elif opt in ("-f", "--from"):
                 project_file = arg
@@ -31,12 +32,14 @@ def start(argv):
             elif opt in ("-s", "--symlink"):
                 symlink_dir = os.path.abspath(arg)
                 os.makedirs(symlink_dir, exist_ok=True)
+            elif opt in ("-p", "--prepare"):
+                prepare = True
             else:
                 assert False, "unhandled option"
     except getopt.GetoptError as err:
         # print help information and exit:
         logger.error(err)  # will print something like "option -a not recognized"
-        print('Usage:\n clone_projects.py -f|--from=<file> -t|--to=<dir> [-s|--symlink=<dir>]')
+        print('Usage:\n clone_projects.py -f|--from=<file> -t|--to=<dir> [-s|--symlink=<dir>] [-p|--prepare]')
         sys.exit(1)
 
     logging.info("Starting project cloning.")
@@ -58,6 +61,12 @@ def start(argv):
                 RepoCloner.clone(slug, destination_dir)
                 logger.info('Project repository {0} cloned into {1}'.format(slug, s2f))
                 RepoCloner.update_submodules(dest)
+            if prepare:
+                benchmark = RepoPreparer.prepare(dest)
+                if benchmark is not None:
+                    num_commits, before, after = benchmark
+                    logger.info('Walk of {0} commits of {1}: {2:.2f}s before preparation, {3:.2f}s after.'.format(
+                        num_commits, slug, before, after))
             if symlink_dir:
                 try:
                     sym = os.path.join(symlink_dir, s2f)
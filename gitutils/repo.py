@@ -1,5 +1,8 @@
+import json
 import logging
 import os
+import time
+from typing import Dict, Optional, Tuple
 
 import pygit2
 from git import Repo
@@ -42,3 +45,69 @@ class RepoCloner:
             o.pull()
         except Exception as e:
             logger.error('Error pulling git repo {0} at {1}'.format(dest, e))
+
+
+class RepoPreparer:
+    """
+    Prepares a clone for SZZ, whose walk and blames read every commit of the history: loose objects and many packs
+    are repacked into a single pack, and a commit-graph and a multi-pack-index are written, which libgit2 reads
+    to look up commits and objects without inflating them. The libgit2 object cache and memory-mapped pack windows
+    can be sized from a JSON file of settings (see libgit2-settings.json).
+    """
+    SETTINGS = ['cache_max_size', 'cache_object_limits', 'mwindow_size', 'mwindow_mapped_limit']
+    OBJECT_TYPES = {'commit': pygit2.GIT_OBJ_COMMIT, 'tree': pygit2.GIT_OBJ_TREE, 'blob': pygit2.GIT_OBJ_BLOB,
+                    'tag': pygit2.GIT_OBJ_TAG}
+
+    @staticmethod
+    def prepare(dest, benchmark=True) -> Optional[Tuple[int, float, float]]:
+        """
+        Prepares the clone and, if benchmark is set, returns the number of commits walked and the seconds taken
+        to walk them before and after.
+        """
+        try:
+            before = RepoPreparer.benchmark_walk(dest) if benchmark else None
+            repo = Repo(path=dest)
+            logger.info(msg='Repacking repo at {0}.'.format(dest))
+            repo.git.repack('-a', '-d')
+            logger.info(msg='Writing commit-graph and multi-pack-index of repo at {0}.'.format(dest))
+            repo.git.config('core.commitGraph', 'true')
+            repo.git.commit_graph('write', '--reachable')
+            repo.git.multi_pack_index('write')
+            if before is not None:
+                num_commits, after = RepoPreparer.benchmark_walk(dest)
+                return num_commits, before[1], after
+        except Exception as e:
+            logger.error('Error preparing git repo {0}: {1}'.format(dest, e))
+        return None
+
+    @staticmethod
+    def benchmark_walk(dest) -> Tuple[int, float]:
+        """Number of commits and seconds taken to walk the history by time, loading the tree of each commit."""
+        start = time.time()
+        repo = pygit2.Repository(dest)
+        num_commits = 0
+        for commit in repo.walk(repo.head.target, pygit2.GIT_SORT_TIME):
+            commit.tree
+            num_commits += 1
+        return num_commits, time.time() - start
+
+    @staticmethod
+    def load_settings(settings_path) -> Dict:
+        with open(settings_path) as f:
+            settings = json.load(f)
+        unknown = set(settings) - set(RepoPreparer.SETTINGS)
+        if unknown:
+            raise ValueError('Unknown libgit2 settings in {0}: {1}'.format(settings_path, ', '.join(sorted(unknown))))
+        return settings
+
+    @staticmethod
+    def configure(settings: Dict):
+        """Applies the libgit2 settings to this process, before it opens any repository."""
+        if 'cache_max_size' in settings:
+            pygit2.settings.cache_max_size(settings['cache_max_size'])
+        for object_type, limit in settings.get('cache_object_limits', {}).items():
+            pygit2.settings.cache_object_limit(RepoPreparer.OBJECT_TYPES[object_type], limit)
+        if 'mwindow_size' in settings:
+            pygit2.settings.mwindow_size = settings['mwindow_size']
+        if 'mwindow_mapped_limit' in settings:
+            pygit2.settings.mwindow_mapped_limit = settings['mwindow_mapped_limit']
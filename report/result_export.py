@@ -78,16 +78,16 @@ def daily_data_per_project(commits_set):
            num_src_files_touched_per_day
 
 
-def __export(input_folder: str, out_folder: str, aliases: dict, basic_classifier):
+def __export(input_folder: str, out_folder: str, aliases: dict, basic_classifier, file_format: str = 'csv'):
     # prj_outfile = argv[0]
     # lang_outfile = argv[1]
 
     logger.info("Retrieving blamed shas of bug-inducing commits (to src files only).")
-    blames_df = utility.read_from_folder(input_folder, "*_blames_commit.csv", usecols=["SLUG", "BUG_FIXING_COMMIT", "BLAMED_COMMIT", "TYPE", "NUM_BLAMED_LINES"])
-    blamed_df = utility.read_from_folder(input_folder, "*_blamed_commit.csv", usecols=["SLUG", "SHA", "AUTHOR_ID"])
-    issue_links_df = utility.read_from_folder(input_folder, "*_issue_links.csv", usecols=["SLUG","COMMIT_SHA","ISSUE_NUMBER"])
-    contributors_df = utility.read_from_folder(input_folder, "*_contributors.csv")
-    commit_files_df = utility.read_from_folder(input_folder, "*_commit_files.csv")
+    blames_df = utility.read_from_folder(input_folder, "*_blames_commit.csv", usecols=["SLUG", "BUG_FIXING_COMMIT", "BLAMED_COMMIT", "TYPE", "NUM_BLAMED_LINES"], file_format=file_format)
+    blamed_df = utility.read_from_folder(input_folder, "*_blamed_commit.csv", usecols=["SLUG", "SHA", "AUTHOR_ID"], file_format=file_format)
+    issue_links_df = utility.read_from_folder(input_folder, "*_issue_links.csv", usecols=["SLUG","COMMIT_SHA","ISSUE_NUMBER"], file_format=file_format)
+    contributors_df = utility.read_from_folder(input_folder, "*_contributors.csv", file_format=file_format)
+    commit_files_df = utility.read_from_folder(input_folder, "*_commit_files.csv", file_format=file_format)
 
     blamed_commits = blames_df[blames_df.TYPE != BasicFileTypeClassifier.DOC].merge(blamed_df, left_on=['SLUG', 'BLAMED_COMMIT'], right_on=['SLUG', 'SHA'], how='inner').merge(issue_links_df, left_on=["SLUG", "BUG_FIXING_COMMIT"], right_on=["SLUG", "COMMIT_SHA"])[['SLUG', 'BUG_FIXING_COMMIT', 'BLAMED_COMMIT', 'AUTHOR_ID', 'ISSUE_NUMBER', 'NUM_BLAMED_LINES']]
 
@@ -133,7 +133,10 @@ def __export(input_folder: str, out_folder: str, aliases: dict, basic_classifier
         bugs_induced_per_sha[(aliased_uid, blamed_sha, slug)] = bug_fixing_commits
 
     logger.info("Parsing commits.")
-    df_commits = utility.read_from_folder(input_folder, "*_commits.csv")
+    commit_columns = ["SLUG", "SHA", "TIMESTAMP", "AUTHOR_ID", "NUM_ADDITIONS", "NUM_DELETIONS", "NUM_FILES_CHANGED",
+                      "FILES", "SRC_LOC_ADDED", "SRC_LOC_DELETED", "NUM_SRC_FILES_TOUCHED", "SRC_FILES"]
+    # the commits of the runs that produced the outputs, not the commit index that also has those of other runs
+    df_commits = utility.read_from_folder(input_folder, "*_commits.csv", usecols=commit_columns, file_format=file_format)
     commits_per_user = dict()
     dates = set()  # set of all commit dates
     langs = set()  # set of all progr languages used in commits
@@ -285,7 +288,7 @@ def __export(input_folder: str, out_folder: str, aliases: dict, basic_classifier
                          num_src_files_touched, src_loc_added, src_loc_deleted])
 
     logger.info("Writing to files.")
-    prj_outfile = os.path.join(out_folder, "user_project_date_totalcommits.csv")
+    prj_outfile = os.path.join(out_folder, utility.with_format("user_project_date_totalcommits.csv", file_format))
     """
     - user_project_date_totalcommits.csv
         user_id;project;date;num_commits;num_file_touches;num_src_file_touches;num_files_touched;num_src_files_touched;loc_added;src_loc_added;loc_deleted;src_loc_deleted
@@ -296,10 +299,10 @@ def __export(input_folder: str, out_folder: str, aliases: dict, basic_classifier
                   'num_files_touched', 'num_src_files_touched', 'loc_added', 'src_loc_added', 'loc_deleted',
                   'src_loc_deleted', 'num_bugs_induced', 'num_bug_inducing_commits']
     prj_df = pandas.DataFrame(prj_rows, columns=prj_header)
-    prj_df.to_csv(prj_outfile, index=False)
+    utility.write_table(prj_df, prj_outfile)
     logger.info("Done writing %s." % prj_outfile)
 
-    lang_outfile = os.path.join(out_folder, "user_language_date_totalcommits.csv")
+    lang_outfile = os.path.join(out_folder, utility.with_format("user_language_date_totalcommits.csv", file_format))
     """
     - user_language_date_totalcommits.csv
     #user_id;language;date;num_commits;num_file_touches;num_files_touched;loc_added;loc_deleted
@@ -308,19 +311,20 @@ def __export(input_folder: str, out_folder: str, aliases: dict, basic_classifier
     lang_header = ['user_id', 'language', 'day', 'num_commits', 'num_src_file_touches', 'num_src_files_touched',
                    'src_loc_added', 'src_loc_deleted']
     lang_df = pandas.DataFrame(lang_rows, columns=lang_header)
-    lang_df.to_csv(lang_outfile, index=False)
+    utility.write_table(lang_df, lang_outfile)
     logger.info("Done writing %s." % lang_outfile)
 
 
 if __name__ == '__main__':
-    help_message = 'Usage:\n result_export.py -i|--input=<input_dir> -o|--output=<output_dir>'
+    help_message = 'Usage:\n result_export.py -i|--input=<input_dir> -o|--output=<output_dir> [-f|--format=csv|parquet]'
     input_dir = None
     out_dir = None
+    file_format = 'csv'
 
     try:
         if not sys.argv[1:]:
             raise getopt.GetoptError('No arguments passed from the command line. See help instructions.')
-        opts, args = getopt.getopt(sys.argv[1:], "i:o:H", ["input=", "output=", "help"])
+        opts, args = getopt.getopt(sys.argv[1:], "i:o:f:H", ["input=", "output=", "format=", "help"])
         for opt, arg in opts:
             if opt in ("-h", "--help"):
                 print(help_message)
@@ -329,6 +333,10 @@ if __name__ == '__main__':
                 input_dir = arg
             elif opt in ("-o", "--output"):
                 out_dir = arg
+            elif opt in ("-f", "--format"):
+                if arg not in utility.FORMATS:
+                    raise getopt.GetoptError('Invalid format %s, expected one of %s.' % (arg, ', '.join(utility.FORMATS)))
+                file_format = arg
             else:
                 assert False, "unhandled option"
     except getopt.GetoptError as err:
@@ -343,7 +351,7 @@ if __name__ == '__main__':
         with open(aliases, "rb") as f:
             unpickler = pickle.Unpickler(f)
             alias_map = unpickler.load()
-        __export(input_dir, out_dir, alias_map, BasicFileTypeClassifier())
+        __export(input_dir, out_dir, alias_map, BasicFileTypeClassifier(), file_format)
         logger.info("Done")
     except KeyboardInterrupt:
         logger.error("Received Ctrl-C or another break signal. Exiting.")
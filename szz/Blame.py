@@ -1,17 +1,21 @@
+import sys
+
 from szz.BlamedCommit import BlamedCommit
 
 
 class Blame:
+    __slots__ = ('__oid', '__old_file', '__label', '__blamed', '__num_lines')
+
     def __init__(self, sha: str, old_file: str, label: int, blamed: BlamedCommit, num_lines: int):
-        self.__sha = sha
-        self.__old_file = old_file
+        self.__oid = bytes.fromhex(sha)
+        self.__old_file = sys.intern(old_file)
         self.__label = label
         self.__blamed = blamed
         self.__num_lines = num_lines
 
     @property
     def sha(self):
-        return self.__sha
+        return self.__oid.hex()
 
     @property
     def old_file(self):
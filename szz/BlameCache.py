@@ -0,0 +1,59 @@
+import json
+import sqlite3
+from typing import List, Optional, Tuple
+
+
+class BlameCache:
+    """
+    Persistent cache of libgit2 blame results, stored in a SQLite file.
+    Entries are keyed by (path, parent sha, min line, max line): since the parent commit
+    is immutable, a cached blame never needs to be invalidated. The processes of a job share the file through
+    the SQLite locks, which only work on a local disk.
+    """
+    __FLUSH_EVERY = 100
+
+    def __init__(self, db_path: str):
+        self.__connection = sqlite3.connect(db_path, timeout=300)
+        self.__connection.execute("CREATE TABLE IF NOT EXISTS blame ("
+                                  "path TEXT NOT NULL, sha_parent TEXT NOT NULL, "
+                                  "min_line INTEGER NOT NULL, max_line INTEGER NOT NULL, "
+                                  "hunks TEXT NOT NULL, "
+                                  "PRIMARY KEY (path, sha_parent, min_line, max_line))")
+        self.__connection.commit()
+        self.__pending = []
+        self.__hits = 0
+        self.__misses = 0
+
+    @property
+    def hits(self):
+        return self.__hits
+
+    @property
+    def misses(self):
+        return self.__misses
+
+    def get(self, path: str, sha_parent: str, min_line: int, max_line: int) -> Optional[List[Tuple[str, int, int]]]:
+        row = self.__connection.execute("SELECT hunks FROM blame "
+                                        "WHERE path = ? AND sha_parent = ? AND min_line = ? AND max_line = ?",
+                                        (path, sha_parent, min_line, max_line)).fetchone()
+        if row is None:
+            self.__misses += 1
+            return None
+        self.__hits += 1
+        return [tuple(hunk) for hunk in json.loads(row[0])]
+
+    def put(self, path: str, sha_parent: str, min_line: int, max_line: int, hunks: List[Tuple[str, int, int]]):
+        # writes are buffered and flushed in short transactions, not to hold the lock other processes wait on
+        self.__pending.append((path, sha_parent, min_line, max_line, json.dumps(hunks)))
+        if len(self.__pending) >= self.__FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        if self.__pending:
+            self.__connection.executemany("INSERT OR IGNORE INTO blame VALUES (?, ?, ?, ?, ?)", self.__pending)
+            self.__connection.commit()
+            self.__pending = []
+
+    def close(self):
+        self.flush()
+        self.__connection.close()
@@ -0,0 +1,63 @@
+import time
+from typing import List
+
+from szz.ColumnarTransport import ColumnarTransport
+from szz.LocalComm import LocalComm
+from szz.SzzHunk import SzzHunk
+
+
+class BlameScheduler:
+    """
+    Work queue for the blame phase: rank 0 hands out small batches of hunks on request,
+    so that ranks that get cheap hunks keep pulling work instead of waiting for the slowest one.
+    Hunks are handed out in groups that are never split across batches.
+    """
+    TAG_REQUEST = 11
+    TAG_WORK = 12
+
+    def __init__(self, comm, batch_size: int = 16):
+        self.__comm = comm
+        self.__batch_size = batch_size
+        self.__idle_time = 0.0
+        self.__served = {}
+
+    @property
+    def idle_time(self):
+        """Seconds a worker spent waiting for its next batch."""
+        return self.__idle_time
+
+    @property
+    def served(self):
+        """Number of batches handed out to each worker rank (master only)."""
+        return self.__served
+
+    def serve(self, hunk_groups: List[List[SzzHunk]]):
+        """Master loop, run by rank 0 until every worker has been told there is no work left."""
+        active_workers = self.__comm.Get_size() - 1
+        next_index = 0
+        MPI = LocalComm.api(self.__comm)
+        status = MPI.Status()
+        while active_workers > 0:
+            self.__comm.recv(source=MPI.ANY_SOURCE, tag=self.TAG_REQUEST, status=status)
+            worker = status.Get_source()
+            if next_index < len(hunk_groups):
+                batch = []
+                while next_index < len(hunk_groups) and len(batch) < self.__batch_size:
+                    batch.extend(hunk_groups[next_index])
+                    next_index += 1
+                self.__served[worker] = self.__served.get(worker, 0) + 1
+                self.__comm.send(ColumnarTransport.encode_hunks(batch), dest=worker, tag=self.TAG_WORK)
+            else:
+                self.__comm.send(None, dest=worker, tag=self.TAG_WORK)
+                active_workers -= 1
+
+    def batches(self):
+        """Worker side: yields batches of hunks from rank 0 until the queue is drained."""
+        while True:
+            start = time.time()
+            self.__comm.send(None, dest=0, tag=self.TAG_REQUEST)
+            batch = self.__comm.recv(source=0, tag=self.TAG_WORK)
+            self.__idle_time += time.time() - start
+            if batch is None:
+                return
+            yield ColumnarTransport.decode_hunks(batch)
@@ -2,4 +2,4 @@ from szz.Commit import Commit
 
 
 class BlamedCommit(Commit):
-    pass
\ No newline at end of file
+    __slots__ = ()
\ No newline at end of file
@@ -0,0 +1,58 @@
+import glob
+import os
+import pickle
+import time
+from typing import List, Set
+
+
+class Checkpoint:
+    """
+    Periodically persists the work completed by a process into shard files, so that a job can be resumed.
+    Shards are keyed by commit sha and (file, parent commit) group rather than by rank, thus they can be
+    loaded back by a job with a different number of processes. Each shard records the HEAD of the walk, since
+    the positions of the commits in the walk only hold for the same HEAD.
+    """
+    WALK = "walk"
+    BLAME = "blame"
+
+    def __init__(self, folder: str, run_id: str, rank: int, interval: float, head: str):
+        self.__folder = folder
+        self.__run_id = run_id
+        self.__rank = rank
+        self.__interval = interval
+        self.__head = head
+        self.__sequence = 0
+        self.__start = time.time()
+        self.__last_save = self.__start
+
+    def due(self) -> bool:
+        return self.__interval > 0 and time.time() - self.__last_save >= self.__interval
+
+    def outlasted(self) -> bool:
+        """Whether the process has been working for more than one interval: shorter work is not worth saving."""
+        return self.__interval > 0 and time.time() - self.__start >= self.__interval
+
+    def save(self, kind: str, data: dict):
+        """Writes a new shard; the file only becomes visible once it has been completely written to disk."""
+        self.__sequence += 1
+        shard_path = os.path.join(self.__folder, "{0}_{1}_{2}_{3}.pkl".format(kind, self.__run_id, self.__rank,
+                                                                              self.__sequence))
+        with open(shard_path + ".tmp", "wb") as f:
+            pickle.dump({**data, 'head': self.__head}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(shard_path + ".tmp", shard_path)
+        self.__last_save = time.time()
+
+    @staticmethod
+    def heads(shards: List[dict]) -> Set[str]:
+        """HEAD of the walk of each shard, None for the shards that do not record it."""
+        return {shard.get('head') for shard in shards}
+
+    @staticmethod
+    def load(folder: str, kind: str) -> List[dict]:
+        shards = []
+        for shard_path in sorted(glob.glob(os.path.join(folder, kind + "_*.pkl"))):
+            with open(shard_path, "rb") as f:
+                shards.append(pickle.load(f))
+        return shards
@@ -0,0 +1,283 @@
+import io
+import itertools
+import pickle
+from datetime import datetime, timedelta
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pytz
+
+from szz.SzzCommit import SzzCommit
+from szz.SzzHunk import SzzHunk
+from szz.SzzPatch import SzzPatch
+
+EPOCH = datetime(1970, 1, 1, tzinfo=pytz.utc)
+MICROSECOND = timedelta(microseconds=1)
+ZERO = timedelta(0)
+
+
+class ColumnarTransport:
+    """
+    Moves the data exchanged between processes as flat byte buffers, with the buffer-based MPI collectives.
+    Rows are encoded by column: commit shas as 20-byte binary ids, repeated strings (paths, slugs, contributor ids)
+    once per buffer and referenced by index, numbers and timestamps as numpy arrays. A column holding values
+    of an unexpected type is pickled as a whole, so that decoding always gives back the original values.
+    """
+    OID = 'oid'
+    STR = 'str'
+    INT = 'int'
+    FLOAT = 'float'
+    BOOL = 'bool'
+    TIME = 'time'
+    OBJECT = 'object'
+
+    COMMIT_INDEX_KINDS = [OID, TIME, STR, STR, STR, INT, INT, INT, INT, STR, INT, INT, INT, STR]
+    CONTRIBUTOR_KINDS = [STR, STR, STR]
+    ISSUE_REF_KINDS = [OID, INT]
+    PATCH_KINDS = [OID, OID, STR, INT]
+    HUNK_KINDS = [INT, INT, INT, INT]
+    COMMENT_LINE_KINDS = [INT]
+
+    def __init__(self, comm):
+        self.__comm = comm
+        self.__rank = comm.Get_rank()
+
+    def gather(self, buffer: np.ndarray) -> List[np.ndarray]:
+        """Gathers the buffer of each process on rank 0, returns them in rank order (None on the other ranks)."""
+        counts = self.__comm.gather(len(buffer), root=0)
+        received = None
+        if self.__rank == 0:
+            received = np.empty(sum(counts), dtype=np.uint8)
+            self.__comm.Gatherv(buffer, [received, counts], root=0)
+            offsets = np.cumsum([0] + counts)
+            return [received[offsets[i]:offsets[i + 1]] for i in range(len(counts))]
+        self.__comm.Gatherv(buffer, received, root=0)
+        return None
+
+    def scatter(self, buffers: List[np.ndarray]) -> np.ndarray:
+        """Sends the i-th buffer of rank 0 to the process with rank i."""
+        send = None
+        counts = None
+        if self.__rank == 0:
+            counts = [len(buffer) for buffer in buffers]
+            send = [np.concatenate(buffers) if buffers else np.empty(0, dtype=np.uint8), counts]
+        received = np.empty(self.__comm.scatter(counts, root=0), dtype=np.uint8)
+        self.__comm.Scatterv(send, received, root=0)
+        return received
+
+    def bcast(self, buffer: np.ndarray) -> np.ndarray:
+        """Copies the buffer of rank 0 to every process."""
+        count = self.__comm.bcast(len(buffer) if self.__rank == 0 else None, root=0)
+        if self.__rank != 0:
+            buffer = np.empty(count, dtype=np.uint8)
+        self.__comm.Bcast(buffer, root=0)
+        return buffer
+
+    @staticmethod
+    def __pack(arrays: List[np.ndarray]) -> np.ndarray:
+        stream = io.BytesIO()
+        np.save(stream, np.array([len(arrays)], dtype=np.int64), allow_pickle=False)
+        for array in arrays:
+            np.save(stream, array, allow_pickle=False)
+        return np.frombuffer(stream.getbuffer(), dtype=np.uint8)
+
+    @staticmethod
+    def __unpack(buffer: np.ndarray) -> List[np.ndarray]:
+        stream = io.BytesIO(memoryview(buffer))
+        num_arrays = int(np.load(stream, allow_pickle=False)[0])
+        return [np.load(stream, allow_pickle=False) for _ in range(num_arrays)]
+
+    @staticmethod
+    def __valid(kind: str, values: Sequence) -> bool:
+        """Checks the types of the values once per distinct type, rather than once per value."""
+        types = set(map(type, values))
+        types.discard(type(None))
+        if kind == ColumnarTransport.OID:
+            return types <= {str} and all(len(value) == 40 for value in values if value is not None)
+        if kind == ColumnarTransport.STR:
+            return types <= {str}
+        if kind == ColumnarTransport.INT:
+            return all(issubclass(t, (int, np.integer)) and not issubclass(t, (bool, np.bool_)) for t in types)
+        if kind == ColumnarTransport.FLOAT:
+            return all(issubclass(t, (float, np.floating)) for t in types)
+        if kind == ColumnarTransport.BOOL:
+            return all(issubclass(t, (bool, np.bool_)) for t in types)
+        if kind == ColumnarTransport.TIME:
+            return all(issubclass(t, datetime) for t in types) and all(
+                value.utcoffset() == ZERO for value in values if value is not None)
+        return False
+
+    @staticmethod
+    def __encode_column(kind: str, values: Sequence) -> List[np.ndarray]:
+        """Encodes a column as its kind, the values and a mask of the missing ones."""
+        values = list(values)
+        mask = np.empty(0, dtype=bool)
+        if not ColumnarTransport.__valid(kind, values):
+            kind = ColumnarTransport.OBJECT
+        elif kind != ColumnarTransport.STR and None in values:
+            present = [value is not None for value in values]
+            mask = np.array(present, dtype=bool)
+            default = {ColumnarTransport.OID: '0' * 40, ColumnarTransport.FLOAT: 0.0,
+                       ColumnarTransport.TIME: EPOCH}.get(kind, 0)
+            values = [value if value is not None else default for value in values]
+        header = np.array([kind])
+
+        if kind == ColumnarTransport.OBJECT:
+            return [header, np.frombuffer(pickle.dumps(values, protocol=pickle.HIGHEST_PROTOCOL), dtype=np.uint8),
+                    mask]
+        if kind == ColumnarTransport.OID:
+            return [header, np.frombuffer(bytes.fromhex(''.join(values)), dtype=np.uint8), mask]
+        if kind == ColumnarTransport.STR:
+            interned = {}
+            indexes = np.array([interned.setdefault(value, len(interned)) if value is not None else -1
+                                for value in values], dtype=np.int32)
+            encoded = [value.encode('utf8', 'surrogatepass') for value in interned]
+            offsets = np.cumsum([0] + [len(value) for value in encoded], dtype=np.int64)
+            return [header, ColumnarTransport.__narrow(indexes), np.frombuffer(b''.join(encoded), dtype=np.uint8),
+                    offsets, mask]
+        if kind == ColumnarTransport.INT:
+            return [header, ColumnarTransport.__narrow(np.array(values, dtype=np.int64)), mask]
+        if kind == ColumnarTransport.FLOAT:
+            return [header, np.array(values, dtype=np.float64), mask]
+        if kind == ColumnarTransport.BOOL:
+            return [header, np.array(values, dtype=bool), mask]
+        return [header, np.array([(value - EPOCH) // MICROSECOND for value in values], dtype=np.int64), mask]
+
+    @staticmethod
+    def __narrow(values: np.ndarray) -> np.ndarray:
+        """Integers are sent with the smallest type that holds them, line numbers and labels rarely need 8 bytes."""
+        if len(values) == 0:
+            return values
+        low, high = int(values.min()), int(values.max())
+        for dtype in (np.int8, np.int16, np.int32):
+            if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+                return values.astype(dtype)
+        return values
+
+    @staticmethod
+    def __decode_column(arrays: List[np.ndarray]) -> list:
+        kind = str(arrays[0][0])
+        mask = arrays[-1]
+        if kind == ColumnarTransport.OBJECT:
+            return pickle.loads(arrays[1].tobytes())
+        if kind == ColumnarTransport.OID:
+            hex_string = arrays[1].tobytes().hex()
+            values = [hex_string[i:i + 40] for i in range(0, len(hex_string), 40)]
+        elif kind == ColumnarTransport.STR:
+            blob = arrays[2].tobytes()
+            offsets = arrays[3].tolist()
+            table = [blob[offsets[i]:offsets[i + 1]].decode('utf8', 'surrogatepass') for i in range(len(offsets) - 1)]
+            values = [table[index] if index >= 0 else None for index in arrays[1].tolist()]
+        elif kind == ColumnarTransport.TIME:
+            values = [EPOCH + timedelta(microseconds=value) for value in arrays[1].tolist()]
+        else:
+            values = arrays[1].tolist()
+        if len(mask):
+            values = [value if present else None for value, present in zip(values, mask.tolist())]
+        return values
+
+    @staticmethod
+    def __num_arrays(kind_header: np.ndarray) -> int:
+        return 5 if str(kind_header[0]) == ColumnarTransport.STR else 3
+
+    @staticmethod
+    def __encode_tables(tables: List[tuple]) -> np.ndarray:
+        """Packs (columns, kinds) tables into a single buffer."""
+        arrays = [np.array([len(tables)], dtype=np.int64)]
+        for columns, kinds in tables:
+            arrays.append(np.array([len(columns[0]) if columns else 0, len(kinds)], dtype=np.int64))
+            for kind, column in zip(kinds, columns):
+                arrays.extend(ColumnarTransport.__encode_column(kind, column))
+        return ColumnarTransport.__pack(arrays)
+
+    @staticmethod
+    def __decode_tables(buffer: np.ndarray) -> List[list]:
+        """Unpacks the tables of a buffer, each as a list of columns."""
+        arrays = ColumnarTransport.__unpack(buffer)
+        tables = []
+        position = 1
+        for _ in range(int(arrays[0][0])):
+            num_rows, num_columns = arrays[position].tolist()
+            position += 1
+            columns = []
+            for _ in range(num_columns):
+                num_arrays = ColumnarTransport.__num_arrays(arrays[position])
+                columns.append(ColumnarTransport.__decode_column(arrays[position:position + num_arrays]))
+                position += num_arrays
+            tables.append(columns)
+        return tables
+
+    @staticmethod
+    def encode_arrays(arrays: List[np.ndarray]) -> np.ndarray:
+        """Packs numpy arrays of any non-object type as they are."""
+        return ColumnarTransport.__pack(arrays)
+
+    @staticmethod
+    def decode_arrays(buffer: np.ndarray) -> List[np.ndarray]:
+        return ColumnarTransport.__unpack(buffer)
+
+    @staticmethod
+    def encode_rows(rows: Sequence[Sequence], kinds: List[str]) -> np.ndarray:
+        columns = list(zip(*rows)) if len(rows) else [()] * len(kinds)
+        return ColumnarTransport.__encode_tables([(columns, kinds)])
+
+    @staticmethod
+    def decode_rows(buffer: np.ndarray) -> List[tuple]:
+        return list(zip(*ColumnarTransport.__decode_tables(buffer)[0]))
+
+    @staticmethod
+    def encode_hunks(hunks: List[SzzHunk]) -> np.ndarray:
+        """
+        Hunks are sent as a table of their distinct patches, a table of hunks and a table of the offsets of their
+        comment lines, since the bitmap of a long hunk does not fit in an integer column.
+        """
+        patch_indexes = {}
+        patches = []
+        hunk_patches = []
+        comment_offsets = []
+        num_comments = []
+        for hunk in hunks:
+            patch = hunk.patch
+            patch_index = patch_indexes.get(id(patch))
+            if patch_index is None:
+                patch_index = patch_indexes[id(patch)] = len(patches)
+                patches.append(patch)
+            hunk_patches.append(patch_index)
+            offsets = ColumnarTransport.__bits(hunk.comment_lines)
+            comment_offsets.extend(offsets)
+            num_comments.append(len(offsets))
+        patch_columns = [[patch.commit.sha for patch in patches], [patch.commit.sha_parent for patch in patches],
+                         [patch.old_file for patch in patches], [patch.label for patch in patches]]
+        hunk_columns = [hunk_patches, [hunk.old_start for hunk in hunks], [hunk.old_lines for hunk in hunks],
+                        num_comments]
+        return ColumnarTransport.__encode_tables([(patch_columns, ColumnarTransport.PATCH_KINDS),
+                                                  (hunk_columns, ColumnarTransport.HUNK_KINDS),
+                                                  ([comment_offsets], ColumnarTransport.COMMENT_LINE_KINDS)])
+
+    @staticmethod
+    def decode_hunks(buffer: np.ndarray) -> List[SzzHunk]:
+        patch_columns, hunk_columns, (comment_offsets,) = ColumnarTransport.__decode_tables(buffer)
+        commits = {}
+        patches = []
+        for sha, sha_parent, old_file, label in zip(*patch_columns):
+            commit = commits.get(sha)
+            if commit is None:
+                commit = commits[sha] = SzzCommit(sha=sha, sha_parent=sha_parent)
+            patches.append(SzzPatch(old_file=old_file, label=label, commit=commit))
+        comment_offsets = iter(comment_offsets)
+        return [SzzHunk(old_lines=old_lines, old_start=old_start, patch=patches[patch_index],
+                        comment_lines=sum(1 << offset for offset in itertools.islice(comment_offsets, num_comments)))
+                for patch_index, old_start, old_lines, num_comments in zip(*hunk_columns)]
+
+    @staticmethod
+    def __bits(value: int) -> List[int]:
+        """Positions of the bits set in the value."""
+        return [i for i, bit in enumerate(reversed(bin(value)[2:])) if bit == '1']
+
+    @staticmethod
+    def encode_commit_index(entries: Dict[str, tuple]) -> np.ndarray:
+        return ColumnarTransport.encode_rows(list(entries.values()), ColumnarTransport.COMMIT_INDEX_KINDS)
+
+    @staticmethod
+    def decode_commit_index(buffer: np.ndarray) -> Dict[str, tuple]:
+        return {row[0]: row for row in ColumnarTransport.decode_rows(buffer)}
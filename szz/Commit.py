@@ -1,6 +1,11 @@
 class Commit:
+    """The sha is kept as a raw 20-byte id and returned as hex."""
+    __slots__ = ('__oid', '__timestamp', '__author_id', '__committer_id', '__message', '__num_parents',
+                 '__num_additions', '__num_deletions', '__num_files_changed', '__files', '__src_loc_added',
+                 '__src_loc_deleted', '__num_src_files_touched', '__src_files')
+
     def __init__(self, sha: str, timestamp, author_id: str, committer_id: str, message: str, num_parents: int, num_additions: int, num_deletions: int, num_files_changed: int, files: int, src_loc_added: int, src_loc_deleted: int, num_src_files_touched: int, src_files: str):
-        self.__sha = sha
+        self.__oid = bytes.fromhex(sha)
         self.__timestamp = timestamp
         self.__author_id = author_id
         self.__committer_id = committer_id
@@ -17,7 +22,7 @@ class Commit:
 
     @property
     def sha(self):
-        return self.__sha
+        return self.__oid.hex()
 
     @property
     def timestamp(self):
@@ -0,0 +1,66 @@
+import os
+from typing import Dict, Optional
+
+import pandas as pd
+
+from szz.BlamedCommit import BlamedCommit
+from szz.Commit import Commit
+from utils import utility
+
+
+class CommitIndex:
+    """
+    Stats of the commits seen during the walk, indexed by sha, so that the blame phase
+    does not need to look up and diff again the blamed commits.
+    """
+    COLUMNS = ["SHA", "TIMESTAMP", "AUTHOR_ID", "COMMITTER_ID", "FIRST_MSG_LINE", "NUM_PARENTS",
+               "NUM_ADDITIONS", "NUM_DELETIONS", "NUM_FILES_CHANGED", "FILES",
+               "SRC_LOC_ADDED", "SRC_LOC_DELETED", "NUM_SRC_FILES_TOUCHED", "SRC_FILES"]
+
+    def __init__(self, entries: Dict[str, tuple] = None):
+        self.__entries = entries if entries is not None else {}
+
+    @property
+    def entries(self) -> Dict[str, tuple]:
+        return self.__entries
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __contains__(self, sha: str):
+        return sha in self.__entries
+
+    def add(self, commit: Commit, first_msg_line: str):
+        self.__entries[commit.sha] = (commit.sha, commit.timestamp, commit.author_id, commit.committer_id,
+                                      first_msg_line, commit.num_parents, commit.num_additions, commit.num_deletions,
+                                      commit.num_files_changed, commit.files, commit.src_loc_added,
+                                      commit.src_loc_deleted, commit.num_src_files_touched, commit.src_files)
+
+    def update(self, entries: Dict[str, tuple]):
+        self.__entries.update(entries)
+
+    def get(self, sha: str) -> Optional[BlamedCommit]:
+        """Returns the indexed commit as a blamed commit (i.e., with the first line of the message only)."""
+        entry = self.__entries.get(sha)
+        if entry is None:
+            return None
+        return BlamedCommit(*entry)
+
+    def save(self, file_path: str, slug: str):
+        df = pd.DataFrame(list(self.__entries.values()), columns=self.COLUMNS)
+        df.insert(0, "SLUG", slug)
+        utility.write_table(df, file_path)
+
+    @staticmethod
+    def load(file_path: str) -> 'CommitIndex':
+        if not os.path.exists(file_path):
+            return CommitIndex()
+        df = utility.read_table(file_path, usecols=CommitIndex.COLUMNS,
+                                dtype={"FILES": str, "SRC_FILES": str, "FIRST_MSG_LINE": str})
+        df["TIMESTAMP"] = pd.to_datetime(df["TIMESTAMP"], utc=True)
+        entries = {}
+        for row in df.itertuples(index=False):
+            entry = tuple(row)
+            entries[entry[0]] = entry[:1] + (entry[1].to_pydatetime(),) + tuple(
+                value.item() if hasattr(value, 'item') else value for value in entry[2:])
+        return CommitIndex(entries)
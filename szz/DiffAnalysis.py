@@ -0,0 +1,96 @@
+import os
+import logging
+
+import pygit2
+
+logger = logging.getLogger('SZZ-DIFF-ANALYSIS')
+
+
+class DiffAnalysis:
+    """
+    Collects, in a single pass over the patches of a diff, the commit stats, the stats about changes to src files
+    and the per-file rows. Line counts come from libgit2 line stats, the patches are kept for the SZZ hunk extraction.
+    """
+    def __init__(self, basic_classifier, diff: pygit2.Diff):
+        self.__insertions = 0
+        self.__deletions = 0
+        self.__src_loc_added = 0
+        self.__src_loc_deleted = 0
+        self.__num_src_files_touched = 0
+        self.__patches = []
+        self.__files = []
+        all_files = []
+        src_files = []
+
+        for patch in diff:
+            _, additions, deletions = patch.line_stats
+            self.__insertions += additions
+            self.__deletions += deletions
+
+            f = patch.delta.new_file
+            file_name = os.path.basename(f.path)
+            self.__patches.append(patch)
+            self.__files.append((file_name, additions, -deletions, basic_classifier.labelFile(file_name)))
+
+            if not patch.delta.is_binary:
+                """
+                unlike the blame part, here we look at the new files of the patch
+                as they contain both the old files that are being modified, plus
+                the new ones, just created from scratch
+                """
+                all_files.append(file_name)
+                if basic_classifier.labelFile(f.path) != basic_classifier.DOC:  # not a doc file
+                    self.__num_src_files_touched += 1
+                    src_files.append(file_name)
+                    self.__src_loc_added += additions
+                    self.__src_loc_deleted += deletions
+                else:
+                    logger.debug("Skipped doc file %s" % f.path)
+            else:
+                logger.debug("Skipped binary delta.")
+
+        self.__all_files = ';'.join(all_files)
+        self.__src_files = ';'.join(src_files)
+
+    @property
+    def insertions(self):
+        return self.__insertions
+
+    @property
+    def deletions(self):
+        return self.__deletions
+
+    @property
+    def files_changed(self):
+        return len(self.__patches)
+
+    @property
+    def all_files(self):
+        """Semi-colon list of the names of the non-binary files."""
+        return self.__all_files
+
+    @property
+    def src_files(self):
+        """Semi-colon list of the names of the non-binary, non-doc files."""
+        return self.__src_files
+
+    @property
+    def num_src_files_touched(self):
+        return self.__num_src_files_touched
+
+    @property
+    def src_loc_added(self):
+        return self.__src_loc_added
+
+    @property
+    def src_loc_deleted(self):
+        return self.__src_loc_deleted
+
+    @property
+    def patches(self):
+        return self.__patches
+
+    @property
+    def files(self):
+        """(file name, lines added, minus lines deleted, file type) for each patch, as in the commit files output."""
+        return self.__files
@@ -1,4 +1,3 @@
-import pandas as pd
 from dateutil import parser
 import datetime
 from typing import Dict
@@ -10,19 +9,16 @@ class Issue:
         self.__title = title
         self.__labels = None if labels is None or labels == '' else labels.split(";")
         self.__is_pl = is_pl
-        if created_at is not None and created_at != 'None':
-            st = parser.parse(created_at)
-            self.__created_at = datetime.datetime(st.year, st.month, st.day, st.hour,
-                                                  st.minute, st.second)
-        else:
-            self.__created_at = None
-
-        if closed_at is not None and closed_at != 'None':
-            st = parser.parse(closed_at)
-            self.__closed_at = datetime.datetime(st.year, st.month, st.day, st.hour,
-                                                 st.minute, st.second)
-        else:
-            self.__closed_at = None
+        self.__created_at = Issue.__to_datetime(created_at)
+        self.__closed_at = Issue.__to_datetime(closed_at)
+
+    @staticmethod
+    def __to_datetime(value):
+        """Naive datetime to the second, from a string or from a datetime already parsed."""
+        if value is None or value == 'None':
+            return None
+        st = value if isinstance(value, datetime.datetime) else parser.parse(value)
+        return datetime.datetime(st.year, st.month, st.day, st.hour, st.minute, st.second)
 
     @property
     def number(self):
@@ -54,14 +50,8 @@ class Issue:
 
 
 def from_csv(csv_path: str) -> Dict[int, Issue]:
-    issue_dict = dict()
-    df = pd.read_csv(csv_path, index_col=False, dtype={'NUMBER': int, 'LABELS': str}, na_filter=False)
-    for row in df.itertuples():
-        issue = Issue(getattr(row, 'NUMBER'), getattr(row, 'TITLE'), getattr(row, 'CREATED_AT'),
-                      getattr(row, 'CLOSED_AT'), getattr(row, 'LABELS'), getattr(row, 'IS_PL'))
-        issue_dict[issue.number] = issue
-
-    return issue_dict
+    from szz.IssueTable import IssueTable
+    return dict(IssueTable.load(csv_path, []).items())
 
 
 def main():
@@ -0,0 +1,163 @@
+import re
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from dateutil import parser
+
+from szz.Issue import Issue
+from utils import utility
+
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+MISSING = ('', 'None', 'nan', 'NaT')
+
+
+class IssueTable:
+    """
+    Issues of a project as columns sorted by number: creation and closing dates as datetime64 (NaT if missing),
+    whether each one is a pull request, its labels, and a bitmask of the valid labels it has (bit i for the i-th
+    valid label, at most 64 of them). The table is loaded once with vectorized parsing, and sent to the other
+    processes as a buffer. Looking up an issue by number gives back an Issue.
+    """
+    def __init__(self, numbers: np.ndarray, created_at: np.ndarray, closed_at: np.ndarray, is_pr: np.ndarray,
+                 labels: np.ndarray, label_masks: np.ndarray):
+        self.__numbers = numbers
+        self.__created_at = created_at
+        self.__closed_at = closed_at
+        self.__is_pr = is_pr
+        self.__labels = labels
+        self.__label_masks = label_masks
+
+    @staticmethod
+    def load(file_path: str, valid_labels: List[str]) -> 'IssueTable':
+        df = utility.read_table(file_path, usecols=['NUMBER', 'CREATED_AT', 'CLOSED_AT', 'LABELS', 'IS_PL'],
+                                dtype={'NUMBER': int, 'LABELS': str, 'CREATED_AT': str, 'CLOSED_AT': str})
+        # as in a dict of issues, the last row of a number wins
+        df = df.drop_duplicates('NUMBER', keep='last').sort_values('NUMBER')
+        labels = df['LABELS'].fillna('').astype(str).replace('None', '')
+        is_pr = df['IS_PL']
+        if is_pr.dtype != bool:
+            is_pr = is_pr.astype(str).isin(['True', 'true', '1'])
+        return IssueTable(df['NUMBER'].to_numpy(dtype=np.int64), IssueTable.__datetimes(df['CREATED_AT']),
+                          IssueTable.__datetimes(df['CLOSED_AT']), is_pr.to_numpy(dtype=bool),
+                          labels.to_numpy(dtype=str), IssueTable.__label_masks(labels, valid_labels))
+
+    @staticmethod
+    def __datetimes(column: pd.Series) -> np.ndarray:
+        """Datetimes to the second, as written in the file: the offset is dropped rather than applied."""
+        if pd.api.types.is_datetime64_any_dtype(column):
+            if column.dt.tz is not None:
+                column = column.dt.tz_localize(None)
+            return column.dt.floor('s').to_numpy(dtype='datetime64[s]')
+        column = column.astype(str)
+        # ISO date and time, without the fraction of second and the offset, which Issue drops as well
+        parsed = pd.to_datetime(column.str.replace('T', ' ', n=1, regex=False).str.slice(0, 19),
+                                format=DATETIME_FORMAT, errors='coerce').to_numpy(dtype='datetime64[s]')
+        # values in any other format are parsed one by one
+        for i in np.flatnonzero(np.isnat(parsed) & ~column.isin(MISSING).to_numpy()):
+            parsed[i] = np.datetime64(parser.parse(column.iloc[i]).replace(tzinfo=None, microsecond=0), 's')
+        return parsed
+
+    @staticmethod
+    def __label_masks(labels: pd.Series, valid_labels: List[str]) -> np.ndarray:
+        if len(valid_labels) > 64:
+            raise ValueError("At most 64 valid labels are supported, %d given" % len(valid_labels))
+        masks = np.zeros(len(labels), dtype=np.uint64)
+        for i, valid_label in enumerate(valid_labels):
+            pattern = '(?:^|;)%s(?:;|$)' % re.escape(valid_label)
+            has_label = labels.str.contains(pattern, regex=True).to_numpy(dtype=bool)
+            masks[has_label] |= np.uint64(1 << i)
+        return masks
+
+    def to_arrays(self) -> List[np.ndarray]:
+        return [self.__numbers, self.__created_at.view(np.int64), self.__closed_at.view(np.int64), self.__is_pr,
+                self.__labels, self.__label_masks]
+
+    @staticmethod
+    def from_arrays(arrays: List[np.ndarray]) -> 'IssueTable':
+        numbers, created_at, closed_at, is_pr, labels, label_masks = arrays
+        return IssueTable(numbers, created_at.view('datetime64[s]'), closed_at.view('datetime64[s]'), is_pr, labels,
+                          label_masks)
+
+    @property
+    def numbers(self) -> np.ndarray:
+        return self.__numbers
+
+    @property
+    def created_at(self) -> np.ndarray:
+        return self.__created_at
+
+    @property
+    def closed_at(self) -> np.ndarray:
+        return self.__closed_at
+
+    @property
+    def is_pr(self) -> np.ndarray:
+        return self.__is_pr
+
+    @property
+    def label_masks(self) -> np.ndarray:
+        return self.__label_masks
+
+    @property
+    def has_valid_label(self) -> np.ndarray:
+        """Issues without labels, or with at least one of the valid labels."""
+        return (self.__labels == '') | (self.__label_masks != 0)
+
+    def __len__(self):
+        return len(self.__numbers)
+
+    def __contains__(self, number: int):
+        return self.__index(number) is not None
+
+    def indexes(self, numbers) -> np.ndarray:
+        """Row of each issue number, -1 for the numbers not in the table."""
+        numbers = np.asarray(numbers, dtype=np.int64)
+        rows = np.minimum(np.searchsorted(self.__numbers, numbers), max(len(self.__numbers) - 1, 0))
+        found = self.__numbers[rows] == numbers if len(self.__numbers) else np.zeros(len(numbers), dtype=bool)
+        return np.where(found, rows, -1)
+
+    def links(self, issue_ids, authored_times) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Joins issue references, as the referenced numbers and the author times of the commits (seconds since the
+        epoch), with the table. Returns the row of each issue (-1 if unknown), the seconds from its opening and from
+        its closing to the commit (NaN if unknown), and whether the commit closes a valid issue: authored after the
+        issue was opened and not after it was closed, not a pull request, and with no labels or a valid one.
+        """
+        rows = self.indexes(issue_ids)
+        authored = np.asarray(authored_times, dtype=np.float64)
+        if not len(self.__numbers):
+            missing = np.full(len(rows), np.nan)
+            return rows, missing, missing.copy(), np.zeros(len(rows), dtype=bool)
+        found = rows >= 0
+        safe_rows = np.where(found, rows, 0)
+        delta_open = np.where(found, authored - IssueTable.__seconds(self.__created_at[safe_rows]), np.nan)
+        delta_closed = np.where(found, authored - IssueTable.__seconds(self.__closed_at[safe_rows]), np.nan)
+        # comparisons with NaN are false: issues still open are not closed by the commit
+        closes = found & (delta_open > 0) & (delta_closed <= 0) & ~self.__is_pr[safe_rows] & \
+                 self.has_valid_label[safe_rows]
+        return rows, delta_open, delta_closed, closes
+
+    @staticmethod
+    def __seconds(datetimes: np.ndarray) -> np.ndarray:
+        seconds = datetimes.astype('datetime64[s]').view(np.int64).astype(np.float64)
+        seconds[np.isnat(datetimes)] = np.nan
+        return seconds
+
+    def __index(self, number: int) -> Optional[int]:
+        row = int(np.searchsorted(self.__numbers, number))
+        if row < len(self.__numbers) and self.__numbers[row] == number:
+            return row
+        return None
+
+    def __issue(self, row: int) -> Issue:
+        return Issue(int(self.__numbers[row]), None, self.__created_at[row].item(), self.__closed_at[row].item(),
+                     str(self.__labels[row]), bool(self.__is_pr[row]))
+
+    def get(self, number: int) -> Optional[Issue]:
+        row = self.__index(number)
+        return self.__issue(row) if row is not None else None
+
+    def items(self) -> Iterator[Tuple[int, Issue]]:
+        for row in range(len(self.__numbers)):
+            yield int(self.__numbers[row]), self.__issue(row)
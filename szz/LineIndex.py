@@ -0,0 +1,217 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import pygit2
+
+
+class LineIndex:
+    """
+    Blame engine answering the blame queries of a file from the history of that file, walked once. For each revision
+    of the file, the commit that introduced each line is derived from the revisions of its parents, as blame does:
+    lines unchanged with respect to a parent come from that parent, the others are introduced by the commit. Since
+    fixing commits of the same file share most of their history, blaming the file at many revisions costs about as
+    much as blaming it once. Only the revisions changing the file are annotated, files are followed through renames,
+    and the most recently blamed files are kept, up to a number of files and of annotated lines.
+    """
+    LIBGIT2 = 'libgit2'
+    INDEX = 'index'
+    ENGINES = [LIBGIT2, INDEX]
+
+    def __init__(self, max_files: int = 256, max_lines: int = 10000000):
+        self.__max_files = max_files
+        self.__max_lines = max_lines
+        self.__files = OrderedDict()  # path -> {(path, sha): line annotation}, from the least recently used
+        self.__num_lines = {}  # path -> number of annotated lines
+        self.__locks = {}
+        self.__lock = threading.Lock()
+
+    def blame(self, git_repo: pygit2.Repository, path: str, sha: str, min_line: int,
+              max_line: int) -> List[Tuple[str, int, int]]:
+        """Blames the given line range as a list of (blamed sha, start line, number of lines), like libgit2 blame."""
+        with self.__lock:
+            lock = self.__locks.setdefault(path, threading.Lock())
+        # a file is annotated by one thread at a time, the others wait and then reuse its annotations
+        with lock:
+            with self.__lock:
+                annotations = self.__files.pop(path, None)
+                if annotations is None:
+                    annotations = {}
+                    while len(self.__files) >= self.__max_files:
+                        self.__drop_file(self.__files.popitem(last=False)[0])
+                self.__files[path] = annotations
+            annotation = LineIndex.__annotate(git_repo, annotations, path, git_repo.revparse_single(sha))
+            num_lines = sum(len(revision_annotation) for revision_annotation in annotations.values())
+            with self.__lock:
+                # the least recently blamed files are dropped while over the limit of lines, or the file itself
+                self.__num_lines[path] = num_lines
+                while sum(self.__num_lines.values()) > self.__max_lines and len(self.__files) > 1:
+                    self.__drop_file(self.__files.popitem(last=False)[0])
+                if self.__num_lines.get(path, 0) > self.__max_lines:
+                    annotations.clear()
+                    self.__num_lines[path] = 0
+        if annotation is None or max_line > len(annotation):
+            raise ValueError("Line range %d-%d not found in %s at %s" % (min_line, max_line, path, sha))
+
+        blame_hunks = []
+        for line in range(min_line, max_line + 1):
+            blamed_sha = annotation[line - 1]
+            if blame_hunks and blame_hunks[-1][0] == blamed_sha:
+                blame_hunks[-1][2] += 1
+            else:
+                blame_hunks.append([blamed_sha, line, 1])
+        return [tuple(blame_hunk) for blame_hunk in blame_hunks]
+
+    def __drop_file(self, path: str):
+        self.__locks.pop(path, None)
+        self.__num_lines.pop(path, None)
+
+    @staticmethod
+    def __annotate(git_repo: pygit2.Repository, annotations: Dict, path: str,
+                   commit: pygit2.Commit) -> Optional[List[str]]:
+        """
+        Commit introducing each line of the file at the given commit, or None if the file is not there. Only the
+        revisions changing the file are annotated, walking its history depth first from the commit, down to the
+        revisions already annotated or to the creation of the file.
+        """
+        revision = LineIndex.__revision(git_repo, path, commit)
+        if revision is None:
+            return None
+        origins = {}
+        stack = [revision]
+        while stack:
+            path, commit, blob = stack[-1]
+            key = (path, str(commit.id))
+            if key in annotations:
+                stack.pop()
+                continue
+            if key not in origins:
+                origins[key] = [LineIndex.__revision(git_repo, origin_path, parent)
+                                for origin_path, parent in LineIndex.__origins(git_repo, path, commit)]
+            missing = [origin for origin in origins[key] if (origin[0], str(origin[1].id)) not in annotations]
+            if missing:
+                stack.extend(missing)
+                continue
+            annotations[key] = LineIndex.__annotate_revision(commit, blob, [
+                (origin_blob, annotations[(origin_path, str(parent.id))])
+                for origin_path, parent, origin_blob in origins.pop(key)])
+            stack.pop()
+        return annotations[(revision[0], str(revision[1].id))]
+
+    @staticmethod
+    def __revision(git_repo: pygit2.Repository, path: str,
+                   commit: pygit2.Commit) -> Optional[Tuple[str, pygit2.Commit, pygit2.Blob]]:
+        """
+        Revision of the file at the given commit, as (path, commit, blob) of the commit that last changed it, or None
+        if the file is not there. As blame does, the history is followed through the first parent with the same content.
+        """
+        blob = LineIndex.__blob(commit.tree, path)
+        if blob is None:
+            return None
+        while True:
+            for parent in commit.parents:
+                origin_path = LineIndex.__origin_path(git_repo, parent, commit, path)
+                if origin_path is not None and LineIndex.__blob(parent.tree, origin_path).id == blob.id:
+                    path, commit = origin_path, parent
+                    break
+            else:
+                return path, commit, blob
+
+    @staticmethod
+    def __origins(git_repo: pygit2.Repository, path: str, commit: pygit2.Commit) -> List[Tuple[str, pygit2.Commit]]:
+        """Paths of the file in the parents of the commit having it, following renames."""
+        origins = []
+        for parent in commit.parents:
+            origin_path = LineIndex.__origin_path(git_repo, parent, commit, path)
+            if origin_path is not None:
+                origins.append((origin_path, parent))
+        return origins
+
+    @staticmethod
+    def __annotate_revision(commit: pygit2.Commit, blob: pygit2.Blob,
+                            origins: List[Tuple[pygit2.Blob, List[str]]]) -> List[str]:
+        """Lines unchanged with respect to a parent come from the first such parent, the others from the commit."""
+        annotation = [None] * LineIndex.__num_lines(blob.data)
+        for origin_blob, origin_annotation in origins:
+            for new_line, old_line in LineIndex.__unchanged_lines(origin_blob, blob, len(origin_annotation)):
+                if annotation[new_line] is None:
+                    annotation[new_line] = origin_annotation[old_line]
+        sha = str(commit.id)
+        return [line_sha if line_sha is not None else sha for line_sha in annotation]
+
+    @staticmethod
+    def __unchanged_lines(old_blob: pygit2.Blob, new_blob: pygit2.Blob, old_num_lines: int):
+        """
+        Pairs of (new line, old line) indexes of the lines not changed by the diff between the two revisions. The diff
+        is the one of blame: the common tail of the two revisions is left out of it, so that repeated lines are paired
+        with the same old lines as blame pairs them.
+        """
+        old_data = old_blob.data
+        new_data = new_blob.data
+        tail = LineIndex.__common_tail(old_data, new_data)
+        added = set()
+        deleted = set()
+        patch = pygit2.Patch.create_from(old_data[:len(old_data) - tail], new_data[:len(new_data) - tail],
+                                         flag=pygit2.GIT_DIFF_FORCE_TEXT, context_lines=0)
+        for hunk in patch.hunks:
+            for line in hunk.lines:
+                if line.origin == '+':
+                    added.add(line.new_lineno - 1)
+                elif line.origin == '-':
+                    deleted.add(line.old_lineno - 1)
+        # the diff keeps the order of the lines, so the unchanged ones are paired in order
+        old_line = 0
+        for new_line in range(LineIndex.__num_lines(new_data)):
+            if new_line in added:
+                continue
+            while old_line in deleted:
+                old_line += 1
+            if old_line >= old_num_lines:
+                return
+            yield new_line, old_line
+            old_line += 1
+
+    @staticmethod
+    def __common_tail(old_data: bytes, new_data: bytes) -> int:
+        """
+        Size of the tail left out of the diff by blame: the common tail made of whole blocks of 1024 bytes, less the
+        bytes up to the end of its first line.
+        """
+        block = 1024
+        trimmed = 0
+        smaller = min(len(old_data), len(new_data))
+        while trimmed + block <= smaller and \
+                old_data[len(old_data) - trimmed - block:len(old_data) - trimmed] == \
+                new_data[len(new_data) - trimmed - block:len(new_data) - trimmed]:
+            trimmed += block
+        if not trimmed:
+            return 0
+        end_of_line = old_data.find(b'\n', len(old_data) - trimmed)
+        return len(old_data) - end_of_line - 1 if end_of_line >= 0 else 0
+
+    @staticmethod
+    def __origin_path(git_repo: pygit2.Repository, parent: pygit2.Commit, commit: pygit2.Commit,
+                      path: str) -> Optional[str]:
+        """Path of the file in the parent commit, following renames, or None if the commit creates it."""
+        if LineIndex.__blob(parent.tree, path) is not None:
+            return path
+        diff = git_repo.diff(parent, commit)
+        diff.find_similar(pygit2.GIT_DIFF_FIND_RENAMES)
+        for delta in diff.deltas:
+            if delta.status == pygit2.GIT_DELTA_RENAMED and delta.new_file.path == path:
+                return delta.old_file.path
+        return None
+
+    @staticmethod
+    def __blob(tree: pygit2.Tree, path: str) -> Optional[pygit2.Blob]:
+        try:
+            entry = tree[path]
+        except KeyError:
+            return None
+        return entry if isinstance(entry, pygit2.Blob) else None
+
+    @staticmethod
+    def __num_lines(data: bytes) -> int:
+        if not data:
+            return 0
+        return data.count(b'\n') + (0 if data.endswith(b'\n') else 1)
@@ -0,0 +1,158 @@
+import multiprocessing
+import multiprocessing.connection
+import queue
+from typing import List
+
+import numpy as np
+
+
+class LocalComm:
+    """
+    Communicator between the processes of a single machine, with the subset of the mpi4py API used by SZZ,
+    so that SZZ runs in parallel (or in a single process) without MPI. Each process has an inbox queue: messages
+    are (source, tag, object) triples, and those received while waiting for another one are kept aside.
+    Collectives are built on point to point messages, the buffer-based ones copy the buffers.
+    """
+    ANY_SOURCE = -1
+    ANY_TAG = -1
+    COMM_TYPE_SHARED = 1
+    __COLLECTIVE_TAG = -2
+
+    class Status:
+        def __init__(self):
+            self.source = None
+
+        def Get_source(self):
+            return self.source
+
+    def __init__(self, rank: int, inboxes: List):
+        self.__rank = rank
+        self.__inboxes = inboxes
+        self.__pending = []
+
+    @staticmethod
+    def api(comm):
+        """
+        Where to take Status and the constants from for the given communicator:
+        this class for local communicators, the mpi4py MPI module for the others.
+        """
+        if isinstance(comm, LocalComm):
+            return LocalComm
+        from mpi4py import MPI
+        return MPI
+
+    @staticmethod
+    def serial() -> 'LocalComm':
+        """Communicator of a single process."""
+        return LocalComm(0, [queue.SimpleQueue()])
+
+    @staticmethod
+    def spawn(num_processes: int, target, *args, **kwargs):
+        """
+        Runs target(comm, *args, **kwargs) in num_processes local processes, comm being their communicator.
+        If a process fails, the others are terminated, since they may be waiting for it.
+        """
+        inboxes = [multiprocessing.Queue() for _ in range(num_processes)]
+        processes = [multiprocessing.Process(target=LocalComm.run_process, args=(rank, inboxes, target, args, kwargs))
+                     for rank in range(num_processes)]
+        for process in processes:
+            process.start()
+        running = list(processes)
+        failed = None
+        while running and failed is None:
+            ready = multiprocessing.connection.wait([process.sentinel for process in running])
+            for process in [process for process in running if process.sentinel in ready]:
+                process.join()
+                running.remove(process)
+                if process.exitcode != 0 and failed is None:
+                    failed = process
+        for process in running:
+            process.terminate()
+            process.join()
+        if failed is not None:
+            raise RuntimeError("Process %d exited with code %d" % (processes.index(failed), failed.exitcode))
+
+    @staticmethod
+    def run_process(rank: int, inboxes: List, target, args, kwargs):
+        """Entry point of the processes started by spawn()."""
+        target(LocalComm(rank, inboxes), *args, **kwargs)
+
+    def Get_rank(self) -> int:
+        return self.__rank
+
+    def Get_size(self) -> int:
+        return len(self.__inboxes)
+
+    def send(self, obj, dest: int, tag: int = 0):
+        self.__inboxes[dest].put((self.__rank, tag, obj))
+
+    def recv(self, source: int = ANY_SOURCE, tag: int = ANY_TAG, status: Status = None):
+        def matches(message):
+            return source in (LocalComm.ANY_SOURCE, message[0]) and tag in (LocalComm.ANY_TAG, message[1])
+
+        message = next((message for message in self.__pending if matches(message)), None)
+        if message is not None:
+            self.__pending.remove(message)
+        else:
+            message = self.__inboxes[self.__rank].get()
+            while not matches(message):
+                self.__pending.append(message)
+                message = self.__inboxes[self.__rank].get()
+        if status is not None:
+            status.source = message[0]
+        return message[2]
+
+    def bcast(self, obj, root: int = 0):
+        if self.__rank != root:
+            return self.recv(root, self.__COLLECTIVE_TAG)
+        for rank in range(self.Get_size()):
+            if rank != root:
+                self.send(obj, rank, self.__COLLECTIVE_TAG)
+        return obj
+
+    def gather(self, obj, root: int = 0):
+        if self.__rank != root:
+            self.send(obj, root, self.__COLLECTIVE_TAG)
+            return None
+        return [obj if rank == root else self.recv(rank, self.__COLLECTIVE_TAG) for rank in range(self.Get_size())]
+
+    def scatter(self, objs, root: int = 0):
+        if self.__rank != root:
+            return self.recv(root, self.__COLLECTIVE_TAG)
+        for rank in range(self.Get_size()):
+            if rank != root:
+                self.send(objs[rank], rank, self.__COLLECTIVE_TAG)
+        return objs[root]
+
+    def Gatherv(self, sendbuf: np.ndarray, recvbuf, root: int = 0):
+        """recvbuf is [buffer, counts] on the root, with the buffers of the processes stored in rank order."""
+        buffers = self.gather(sendbuf, root)
+        if self.__rank == root:
+            received, _ = recvbuf
+            if buffers:
+                received[:] = np.concatenate(buffers)
+
+    def Scatterv(self, sendbuf, recvbuf: np.ndarray, root: int = 0):
+        """sendbuf is [buffer, counts] on the root, holding the buffers to send to the processes in rank order."""
+        parts = None
+        if self.__rank == root:
+            buffer, counts = sendbuf
+            offsets = np.cumsum([0] + list(counts))
+            parts = [buffer[offsets[i]:offsets[i + 1]] for i in range(len(counts))]
+        recvbuf[:] = self.scatter(parts, root)
+
+    def Bcast(self, buf: np.ndarray, root: int = 0):
+        received = self.bcast(buf if self.__rank == root else None, root)
+        if self.__rank != root:
+            buf[:] = received
+
+    def Barrier(self):
+        self.gather(None)
+        self.bcast(None)
+
+    def Split_type(self, split_type: int, key: int = 0) -> 'LocalComm':
+        """All the processes are on the same node."""
+        return self
+
+    def Free(self):
+        pass
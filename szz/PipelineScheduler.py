@@ -0,0 +1,91 @@
+import time
+from collections import deque
+from typing import List
+
+from szz.ColumnarTransport import ColumnarTransport
+from szz.LocalComm import LocalComm
+from szz.SzzHunk import SzzHunk
+
+
+class PipelineScheduler:
+    """
+    Work queue for the pipelined mode, where the walk and the blame phases overlap: rank 0 hands out chunks of the
+    walk and batches of hunks to blame on request. Workers send the hunks found in a walk chunk along with their next
+    request, and these are queued for blaming right away, while the other workers keep walking. Batches to blame are
+    handed out before walk chunks; when neither is available, a worker waits until a walk chunk in progress returns.
+    """
+    TAG_REQUEST = 21
+    TAG_WORK = 22
+    WALK = 'walk'
+    BLAME = 'blame'
+
+    def __init__(self, comm, batch_size: int = 16):
+        self.__comm = comm
+        self.__batch_size = batch_size
+        self.__idle_time = 0.0
+        self.__served = {}
+
+    @property
+    def idle_time(self):
+        """Seconds a worker spent waiting for its next task."""
+        return self.__idle_time
+
+    @property
+    def served(self):
+        """Number of walk chunks and of blame batches handed out to each worker rank (master only)."""
+        return self.__served
+
+    def serve(self, walk_chunks: List[List[int]], hunk_groups: List[List[SzzHunk]]):
+        """Master loop, run by rank 0 until the walk is over and every hunk found has been handed out for blaming."""
+        active_workers = self.__comm.Get_size() - 1
+        walk_chunks = deque(walk_chunks)
+        hunk_groups = deque(hunk_groups)
+        walking = 0  # walk chunks handed out whose hunks have not been received yet
+        waiting = deque()
+        MPI = LocalComm.api(self.__comm)
+        status = MPI.Status()
+        while active_workers > 0:
+            hunks = self.__comm.recv(source=MPI.ANY_SOURCE, tag=self.TAG_REQUEST, status=status)
+            if hunks is not None:
+                walking -= 1
+                # hunks of the same (file, parent commit) are kept together, to be blamed with a single call
+                groups = {}
+                for hunk in ColumnarTransport.decode_hunks(hunks):
+                    groups.setdefault((hunk.patch.old_file, hunk.patch.commit.sha_parent), []).append(hunk)
+                hunk_groups.extend(groups.values())
+            waiting.append(status.Get_source())
+
+            while waiting:
+                worker = waiting[0]
+                walk_batches, blame_batches = self.__served.get(worker, (0, 0))
+                if hunk_groups:
+                    batch = []
+                    while hunk_groups and len(batch) < self.__batch_size:
+                        batch.extend(hunk_groups.popleft())
+                    self.__served[worker] = (walk_batches, blame_batches + 1)
+                    self.__comm.send((self.BLAME, ColumnarTransport.encode_hunks(batch)), dest=worker,
+                                     tag=self.TAG_WORK)
+                elif walk_chunks:
+                    walking += 1
+                    self.__served[worker] = (walk_batches + 1, blame_batches)
+                    self.__comm.send((self.WALK, walk_chunks.popleft()), dest=worker, tag=self.TAG_WORK)
+                elif walking == 0:
+                    self.__comm.send(None, dest=worker, tag=self.TAG_WORK)
+                    active_workers -= 1
+                else:
+                    break
+                waiting.popleft()
+
+    def request(self, hunks: List[SzzHunk] = None):
+        """
+        Worker side: sends the hunks found in the last walk chunk (None after a blame batch), and returns
+        the next task, as (WALK, walk indexes) or (BLAME, hunks), or None once there is no work left.
+        """
+        start = time.time()
+        self.__comm.send(None if hunks is None else ColumnarTransport.encode_hunks(hunks), dest=0,
+                         tag=self.TAG_REQUEST)
+        task = self.__comm.recv(source=0, tag=self.TAG_WORK)
+        self.__idle_time += time.time() - start
+        if task is not None and task[0] == self.BLAME:
+            task = (self.BLAME, ColumnarTransport.decode_hunks(task[1]))
+        return task
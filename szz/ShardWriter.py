@@ -0,0 +1,76 @@
+import csv
+import glob
+import heapq
+import os
+from typing import Callable, Iterator, List
+
+
+class ShardWriter:
+    """
+    Streams the rows of one output file produced by a process into its own shard, flushing them in batches.
+    Without a sort key, rows are expected to be produced already in output order and are appended to a single run;
+    with a sort key, each flush sorts its batch and writes it to a new run. Runs are merged with merge().
+    """
+    FLUSH_EVERY = 10000
+
+    def __init__(self, folder: str, name: str, rank, columns: List[str], sort_key: Callable = None):
+        self.__folder = folder
+        self.__name = name
+        self.__rank = rank
+        self.__columns = columns
+        self.__sort_key = sort_key
+        self.__sequence = 0
+        self.__rows = []
+
+    @staticmethod
+    def format(value) -> str:
+        """Formats a value as pandas does when writing a csv file."""
+        return '' if value is None else str(value)
+
+    def write(self, row: list):
+        self.__rows.append([ShardWriter.format(value) for value in row])
+        if len(self.__rows) >= self.FLUSH_EVERY:
+            self.flush()
+
+    def write_all(self, rows: List[list]):
+        for row in rows:
+            self.write(row)
+
+    def flush(self):
+        if not self.__rows:
+            return
+        if self.__sort_key is not None:
+            self.__rows.sort(key=self.__sort_key)
+            self.__sequence += 1
+            run_path = os.path.join(self.__folder, "{0}_{1}_{2}.csv".format(self.__name, self.__rank, self.__sequence))
+        else:
+            run_path = os.path.join(self.__folder, "{0}_{1}.csv".format(self.__name, self.__rank))
+        new_run = not os.path.exists(run_path)
+        with open(run_path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            if new_run:
+                writer.writerow(self.__columns)
+            writer.writerows(self.__rows)
+        self.__rows = []
+
+    def close(self):
+        self.flush()
+
+    @staticmethod
+    def runs(folder: str, name: str) -> List[str]:
+        return sorted(glob.glob(os.path.join(folder, name + "_*.csv")))
+
+    @staticmethod
+    def merge(folder: str, name: str, sort_key: Callable) -> Iterator[List[str]]:
+        """Yields the rows of all the runs of an output file, in sort key order (k-way merge)."""
+        files = [open(run_path, newline='', encoding='utf-8') for run_path in ShardWriter.runs(folder, name)]
+        try:
+            readers = []
+            for f in files:
+                reader = csv.reader(f)
+                next(reader, None)  # header
+                readers.append(reader)
+            yield from heapq.merge(*readers, key=sort_key)
+        finally:
+            for f in files:
+                f.close()
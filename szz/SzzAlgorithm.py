@@ -1,46 +1,57 @@
 import os
 os.environ["OPENBLAS_NUM_THREADS"] = "1"
-from os.path import expanduser
 
 import sys
 import getopt
 
 import logging
-import math
 
 import numpy as np
 import pygit2
-import pytz
 
 import loggingcfg
-from szz.Issue import Issue, from_csv
-from githubutils.CommitWrapper import CommitWrapper
+from szz.IssueTable import IssueTable
+from githubutils.CommitWrapper import CommitWrapper, scan_issue_ids
 from activityclassifier import BasicFileTypeClassifier
 from szz.SzzCommit import SzzCommit
 from szz.SzzPatch import SzzPatch
 from szz.SzzHunk import SzzHunk
 from szz.BlamedCommit import BlamedCommit
 from szz.SzzContributor import SzzContributor
-from szz.Blame import Blame
 from szz.Commit import Commit
+from szz.BlameScheduler import BlameScheduler
+from szz.PipelineScheduler import PipelineScheduler
+from szz.BlameCache import BlameCache
+from szz.DiffAnalysis import DiffAnalysis
+from szz.CommitIndex import CommitIndex
+from szz.SzzState import SzzState
+from szz.Checkpoint import Checkpoint
+from szz.ColumnarTransport import ColumnarTransport
+from szz.ShardWriter import ShardWriter
+from szz.LocalComm import LocalComm
+from szz.WalkPartition import WalkPartition
+from szz.WalkScope import WalkScope
+from szz.LineIndex import LineIndex
+from szz.SzzOptions import SzzOptions
+from gitutils.repo import RepoPreparer
 
 from typing import Dict
-from mpi4py import MPI
 from typing import List
+from typing import Set
+from typing import Tuple
 
+import math
+import threading
+from datetime import datetime
 import time
 import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import hashlib
 import pandas as pd
 import itertools
 from utils import utility
 
-comm = MPI.COMM_WORLD
-rank = comm.Get_rank()
-mpisize = comm.Get_size()
-
-temp_folder = None
-
 log = loggingcfg.initialize_logger('SZZ-MPI', console_level=logging.INFO)
 
 
@@ -50,22 +61,78 @@ class Szz:
                         "NUM_ADDITIONS", "NUM_DELETIONS", "NUM_FILES_CHANGED", "FILES",
                         "SRC_LOC_ADDED",
                         "SRC_LOC_DELETED", "NUM_SRC_FILES_TOUCHED", "SRC_FILES"]
+    __BLAME_COLUMNS = ["SLUG", "BUG_FIXING_COMMIT", "PATH", "TYPE", "BLAMED_COMMIT", "NUM_BLAMED_LINES"]
+    # outputs of the walk: columns, and column with the sha of the commit the row comes from
+    __WALK_OUTPUTS = {"commits": (__COMMIT_COLUMNS, "SHA"),
+                      "commit_files": (["SLUG", "SHA", "COMMIT_FILE", "LOC_INS", "LOC_DEL", "LANG"], "SHA"),
+                      "issue_links": (["SLUG", "COMMIT_SHA", "LINE_NUM", "ISSUE_NUMBER", "ISSUE_IS_PL",
+                                       "DELTA_OPEN", "DELTA_COLSED"], "COMMIT_SHA")}
+    # types of the columns of the outputs that are not strings, used by the typed output formats (i.e., parquet)
+    __COLUMN_TYPES = {"TIMESTAMP": "timestamp", "NUM_PARENTS": "int", "NUM_ADDITIONS": "int", "NUM_DELETIONS": "int",
+                      "NUM_FILES_CHANGED": "int", "SRC_LOC_ADDED": "int", "SRC_LOC_DELETED": "int",
+                      "NUM_SRC_FILES_TOUCHED": "int", "LOC_INS": "int", "LOC_DEL": "int", "LINE_NUM": "int",
+                      "ISSUE_NUMBER": "int", "ISSUE_IS_PL": "bool", "DELTA_OPEN": "float", "DELTA_COLSED": "float",
+                      "NUM_BLAMED_LINES": "int", "TYPE": "int", "LANG": "int"}
+    # chunks of the walk handed out to each worker in pipelined mode: small enough to start blaming early
+    __WALK_CHUNKS_PER_WORKER = 8
 
     def __init__(self, repo_path: str, issues_file_path: str, output_folder: str, valid_labels: List[str],
-                 max_num_files_changed=50, max_new_lines=200):
-        global temp_folder
+                 max_num_files_changed=50, max_new_lines=200, schedule: str = 'static', batch_size: int = 16,
+                 blame_cache: bool = False, scratch_dir: str = None, incremental: bool = False,
+                 checkpoint_interval: float = 0, resume: bool = False, merge: bool = True,
+                 output_format: str = 'csv', partition: str = WalkPartition.CONTIGUOUS, blame_threads: int = 1,
+                 blame_engine: str = LineIndex.LIBGIT2, prepare: bool = False, libgit2_settings: Dict = None,
+                 since: datetime = None, until: datetime = None, paths: List[str] = None, comm=None,
+                 basic_classifier=None):
+        if libgit2_settings:
+            RepoPreparer.configure(libgit2_settings)
+        if comm is None:
+            from mpi4py import MPI
+            comm = MPI.COMM_WORLD
+        self.__comm = comm
+        self.__rank = self.__comm.Get_rank()
+        self.__size = self.__comm.Get_size()
         self.__repo_path = repo_path
         self.__output_folder = output_folder
-        self.__issues_dict: Dict[int, Issue] = from_csv(issues_file_path)
+        # the issues are parsed once and sent to the other processes
+        issue_table = IssueTable.load(issues_file_path, valid_labels) if self.__rank == 0 else None
+        if self.__size > 1:
+            buffer = ColumnarTransport.encode_arrays(issue_table.to_arrays()) if self.__rank == 0 else None
+            issue_table = IssueTable.from_arrays(ColumnarTransport.decode_arrays(
+                ColumnarTransport(self.__comm).bcast(buffer)))
+        self.__issues_dict: IssueTable = issue_table
         self.__valid_labels = valid_labels
-        self.__basic_classifier = BasicFileTypeClassifier()
+        self.__basic_classifier = basic_classifier if basic_classifier is not None else BasicFileTypeClassifier()
         self.__slug = utility.folder_name_to_slug(repo_path)
         self.__max_num_files_changed = max_num_files_changed
         self.__max_new_lines = max_new_lines
         self.__slug_unslashed = self.__slug.replace("/", "_")
         self.__contributors = {}
-        self.__mpi_enabled = mpisize > 1
-        temp_folder = os.path.join(expanduser("~"), "temp_" + self.__slug_unslashed)
+        self.__mpi_enabled = self.__size > 1
+        self.__schedule = schedule
+        self.__batch_size = batch_size
+        self.__blame_cache = blame_cache
+        self.__blame_threads = blame_threads
+        self.__blame_engine = blame_engine
+        self.__prepare = prepare
+        self.__scope = WalkScope(since, until, paths)
+        self.__commit_index = CommitIndex()
+        self.__scratch_dir = scratch_dir
+        self.__node_comm = None
+        self.__incremental = incremental
+        self.__state_path = os.path.join(output_folder, self.__slug_unslashed + "_szz_state.json")
+        self.__last_head = None
+        self.__reevaluated_shas = []
+        self.__walked_shas = set()
+        self.__checkpoint_interval = checkpoint_interval
+        self.__resume = resume
+        self.__checkpoint_folder = os.path.join(output_folder, self.__slug_unslashed + "_checkpoint")
+        self.__checkpoint = None
+        self.__completed_shas = set()
+        self.__merge = merge
+        self.__output_format = output_format
+        self.__partition = partition
+        self.__shard_folder = os.path.join(output_folder, self.__slug_unslashed + "_shards")
 
 
     def __commit_to_metadata(self, commit: Commit):
@@ -75,8 +142,9 @@ class Szz:
                 commit.files, commit.src_loc_added,
                 commit.src_loc_deleted, commit.num_src_files_touched, commit.src_files]
 
-    def __commit_wrapper_to_commit(self, commit: CommitWrapper, git_repo: pygit2.Repository,
-                                   contributors: Dict) -> Commit:
+    @staticmethod
+    def commit_wrapper_to_commit(commit: CommitWrapper, diff_analysis: DiffAnalysis, contributors: Dict) -> Commit:
+        """The commit as walked, i.e., as in the commits output and in the commit index (also used by the planner)."""
         sha = commit.sha
 
         authored_datetime = commit.authored_date
@@ -87,22 +155,14 @@ class Szz:
         (committer_name_l, committer_email_l) = (committer_name.lower(), committer_email.lower())
 
         if (author_name_l, author_email_l) not in contributors:
-            author_id = Szz.__hash_values(self, author_name_l, author_email_l)
+            author_id = Szz.__hash_values(author_name_l, author_email_l)
             contributors[author_id] = (author_name_l, author_email_l)
 
         if (committer_name_l, committer_email_l) not in contributors:
-            committer_id = Szz.__hash_values(self, committer_name_l, committer_email_l)
+            committer_id = Szz.__hash_values(committer_name_l, committer_email_l)
             contributors[committer_id] = (committer_name_l, committer_email_l)
 
         message = commit.message.strip()
-        diff = commit.diff(git_repo)
-        loc_added = diff.stats.insertions
-        loc_deleted = diff.stats.deletions
-        num_files_touched = diff.stats.files_changed
-
-        # get info about changes to src files in the new  commit
-        all_files, src_files, num_src_files_touched, src_loc_added, src_loc_deleted = \
-            CommitWrapper.get_src_changes(self.__basic_classifier, diff)
 
         db_commit = Commit(sha,
                            authored_datetime,
@@ -110,174 +170,325 @@ class Szz:
                            committer_id,
                            message,
                            len(commit.parents),
-                           loc_added,
-                           loc_deleted,
-                           num_files_touched,
-                           all_files,
-                           src_loc_added,
-                           src_loc_deleted,
-                           num_src_files_touched,
-                           src_files)
+                           diff_analysis.insertions,
+                           diff_analysis.deletions,
+                           diff_analysis.files_changed,
+                           diff_analysis.all_files,
+                           diff_analysis.src_loc_added,
+                           diff_analysis.src_loc_deleted,
+                           diff_analysis.num_src_files_touched,
+                           diff_analysis.src_files)
 
         return db_commit
 
     @staticmethod
-    def __inspect_walk(self, git_repo: pygit2.Repository):
+    def __walk_commits(self, git_repo: pygit2.Repository) -> List[pygit2.Commit]:
+        """
+        Returns the commits to process, sorted by time. Also sets __walked_shas to the shas of these commits, whose
+        rows in the output files of the previous runs are replaced.
+        """
+        walker = git_repo.walk(git_repo[git_repo.head.target].id, pygit2.GIT_SORT_TIME)
+        if self.__last_head is not None:
+            # incremental run: stop at the HEAD processed by the previous run
+            walker.hide(self.__last_head)
+        # scoped run: only the commits authored in the date range
+        walk = [commit for commit in itertools.takewhile(lambda commit: not self.__scope.past_window(commit), walker)
+                if self.__scope.in_window(commit)]
+        self.__walked_shas = {str(c.id) for c in walk}
+        # old commits referencing issues changed since the previous run are evaluated again
+        walk += [git_repo.revparse_single(sha) for sha in self.__reevaluated_shas if sha not in self.__walked_shas]
+        self.__walked_shas.update(self.__reevaluated_shas)
+        return walk
+
+    def __walk_writers(self) -> Dict[str, ShardWriter]:
+        # rows are streamed to the shards of this process, prefixed by the position of their commit in the walk
+        return {name: ShardWriter(self.__shard_folder, name, self.__rank, ["WALK_INDEX"] + columns)
+                for name, (columns, _) in self.__WALK_OUTPUTS.items()}
+
+    @staticmethod
+    def fix_hunks(basic_classifier, commit: CommitWrapper, diff_analysis: DiffAnalysis) -> List[SzzHunk]:
+        """Hunks of a bug-fixing commit to blame (also used by the planner)."""
+        szz_commit = SzzCommit(sha=commit.sha, sha_parent=commit.parents[0].hex)
+        szz_hunks = []
+        for patch, (_, _, _, lang) in zip(diff_analysis.patches, diff_analysis.files):
+            # skip changes to test files
+            if lang == basic_classifier.TEST:
+                continue
+
+            # skip changes to binary files
+            if patch.delta.is_binary:
+                continue
+
+            old_file = patch.delta.old_file.path
+            label = basic_classifier.labelFile(old_file)
+
+            # Ignore changes to documentation files
+            if label == basic_classifier.DOC:
+                continue
+
+            szz_patch = SzzPatch(old_file=old_file, label=label, commit=szz_commit)
+
+            for hunk in patch.hunks:
+                comment_lines = 0
+                if hunk.old_lines:
+
+                    for hl in hunk.lines:
+                        """
+                        only changes to deleted lines can be tracked back to when they were first introduced
+                        there is no parent commit that introduced a new line that it's being added in the current
+                        commit for the first time (ie, lines marked with a '+' in the diffs)
+
+                        this is not a basic SZZ implementation, as we classify changes at line level (e.g., skip changes
+                        to line of comments)
+                        """
+                        if hl.origin == '-' and basic_classifier.labelDiffLine(
+                                hl.content.replace('\r', '').replace('\n', '')) != basic_classifier.CG_CODE:
+                            comment_lines |= 1 << (hl.old_lineno - hunk.old_start)
+
+                    szz_hunk = SzzHunk(old_lines=hunk.old_lines, old_start=hunk.old_start, patch=szz_patch,
+                                       comment_lines=comment_lines)
+                    szz_hunks.append(szz_hunk)
+        return szz_hunks
+
+    @staticmethod
+    def __resolve_issue_links(self, walk: List[pygit2.Commit], indexes: List[int]) -> Tuple[Dict, Dict, Set[int]]:
+        """
+        Resolves the issue references of the commits to walk with a single join against the issue table. Returns, by
+        position in the walk, the issue ids referenced by each commit and its issue link rows (line, issue number,
+        whether it is a pull request, seconds from its opening and from its closing), and the fixing commits.
+        """
+        scanned = [i for i in indexes if walk[i].parents and str(walk[i].id) not in self.__completed_shas]
+        # the messages are scanned all together, and the references are mapped back to their commits
+        message_indexes, line_nums, referenced_ids = scan_issue_ids([walk[i].message for i in scanned])
+        positions = np.array(scanned, dtype=np.int64)[message_indexes]
+        authored_times = np.array([walk[i].author.time for i in scanned], dtype=np.int64)[message_indexes]
+
+        rows, delta_open, delta_closed, closes = self.__issues_dict.links(referenced_ids, authored_times)
+        issue_ids = {}
+        for i, issue_id in zip(positions.tolist(), referenced_ids.tolist()):
+            issue_ids.setdefault(i, set()).add(issue_id)
+        issue_ids = {i: sorted(ids) for i, ids in issue_ids.items()}
+
+        found = rows >= 0
+        issue_links = {}
+        for i, line_num, number, is_pr, opened, closed in zip(
+                positions[found].tolist(), line_nums[found].tolist(),
+                self.__issues_dict.numbers[rows[found]].tolist(), self.__issues_dict.is_pr[rows[found]].tolist(),
+                delta_open[found].tolist(), delta_closed[found].tolist()):
+            issue_links.setdefault(i, []).append([line_num, number, is_pr, opened,
+                                                  closed if not math.isnan(closed) else None])
+        fixes = set(positions[closes].tolist())
+        return issue_ids, issue_links, fixes
+
+    @staticmethod
+    def __inspect_walk(self, git_repo: pygit2.Repository, walk: List[pygit2.Commit], indexes: List[int],
+                       writers: Dict[str, ShardWriter]):
         szz_hunks = []
-        issue_links = []
-        commits = []
         contributors = {}
-        commit_files = []
-
-        walk = list(git_repo.walk(git_repo[git_repo.head.target].id, pygit2.GIT_SORT_TIME))
-        walk_size = len(walk)
-        dividend = math.ceil(walk_size / mpisize)
-        start_index = 0
-        if rank > 0:
-            start_index = rank * dividend
-        end_index = walk_size
-        if rank < mpisize - 1:
-            end_index = (rank + 1) * dividend
-            if end_index > walk_size:
-                end_index = walk_size
-
-        for i in range(start_index, end_index):
+        commit_index = CommitIndex()
+        issue_refs = []
+        walked_shas = []
+        saved = [0] * 3  # length of each output list already checkpointed
+        pending = {name: [] for name in writers}  # rows not checkpointed yet
+
+        def output(name, row):
+            writers[name].write(row)
+            if self.__checkpoint is not None:
+                pending[name].append(row)
+
+        def save_walk():
+            outputs = (walked_shas, szz_hunks, issue_refs)
+            self.__checkpoint.save(Checkpoint.WALK, {
+                'shas': walked_shas[saved[0]:], 'szz_hunks': szz_hunks[saved[1]:], 'commits': pending['commits'],
+                'commit_files': pending['commit_files'], 'issue_links': pending['issue_links'],
+                'issue_refs': issue_refs[saved[2]:], 'contributors': dict(contributors),
+                'commit_index': {sha: commit_index.entries[sha] for sha in walked_shas[saved[0]:]
+                                 if sha in commit_index}})
+            for i, output in enumerate(outputs):
+                saved[i] = len(output)
+            for rows in pending.values():
+                rows.clear()
+
+        issue_ids, issue_links, fixes = Szz.__resolve_issue_links(self, walk, indexes)
+
+        for i in indexes:
+            if str(walk[i].id) in self.__completed_shas:
+                # already processed by the job being resumed
+                continue
             commit = CommitWrapper(walk[i])
 
-            authored_datetime = commit.authored_date
-
+            diff = None
             if len(commit.parents) > 0:
-                commits.append(
-                    self.__commit_to_metadata(self.__commit_wrapper_to_commit(commit, git_repo, contributors)))
-                closes_valid_issue = False
-                if commit.message is not None:
-                    commit_issue_ids = commit.issue_ids
-                    if len(commit_issue_ids) > 0:
-                        for (line_num, issue_ids) in commit_issue_ids:
-                            for issue_id in issue_ids:
-                                issue = self.__issues_dict.get(issue_id)
-                                if issue:
-
-                                    delta_open = (
-                                            authored_datetime - issue.created_at.replace(
-                                        tzinfo=pytz.utc)).total_seconds()
-
-                                    if issue.closed_at is not None:
-                                        delta_closed = (
-                                                authored_datetime - issue.closed_at.replace(
-                                            tzinfo=pytz.utc)).total_seconds()
-
-                                    else:
-                                        delta_closed = None
-
-                                    issue_links.append(
-                                        [self.__slug, commit.sha, line_num, issue.number, issue.is_pl, delta_open,
-                                         delta_closed])
-
-                                    """
-                                        Valid issues are those
-                                        1) for which the associated commit was registered *after* the issue was open (delta open > 0)
-                                        2) for which the associated commit was registered *before or exactly when* the associated issue was closed
-                                            (delta closed <= 0)
-                                        3) are not pull requests (is_pr == 1), just issues (is_pr == 0)
-                                    """
-                                    if (not closes_valid_issue) and (
-                                            delta_open > 0 >= delta_closed) and not issue.is_pl:
-                                        if not issue.labels:  # no labels is fine
-                                            closes_valid_issue = True
-                                        else:
-                                            for label in issue.labels:
-                                                if label in self.__valid_labels:
-                                                    closes_valid_issue = True
-                                                    break
-
-                szz_commit = SzzCommit(sha=commit.sha, sha_parent=commit.parents[0].hex)
-
-                for patch in commit.diff(git_repo):
-                    commit_file = os.path.basename(patch.delta.new_file.path)
-                    lang = self.__basic_classifier.labelFile(commit_file)
-                    loc_ins = 0
-                    loc_del = 0
-
-                    for hunk in patch.hunks:
-                        for hl in hunk.lines:
-                            if hl.origin == '-':
-                                loc_del -= 1
-                            elif hl.origin == '+':
-                                loc_ins += 1
-
-                    commit_files.append([self.__slug, commit.sha, commit_file, loc_ins, loc_del, lang])
-
-                    if closes_valid_issue:
-                        # skip changes to test files
-                        if lang == self.__basic_classifier.TEST:
-                            continue
-
-                        # skip changes to binary files
-                        if patch.delta.is_binary:
-                            continue
-
-                        old_file = patch.delta.old_file.path
-                        label = self.__basic_classifier.labelFile(old_file)
-
-                        # Ignore changes to documentation files
-                        if label == self.__basic_classifier.DOC:
-                            continue
-
-                        szz_patch = SzzPatch(old_file=old_file, label=label, commit=szz_commit)
-
-                        for hunk in patch.hunks:
-                            line_labels = {}
-                            if hunk.old_lines:
-
-                                for hl in hunk.lines:
-                                    """
-                                    only changes to deleted lines can be tracked back to when they were first introduced
-                                    there is no parent commit that introduced a new line that it's being added in the current
-                                    commit for the first time (ie, lines marked with a '+' in the diffs)
-
-                                    this is not a basic SZZ implementation, as we classify changes at line level (e.g., skip changes
-                                    to line of comments)
-                                    """
-                                    if hl.origin == '-':
-                                        line_labels[hl.old_lineno] = self.__basic_classifier.labelDiffLine(
-                                            hl.content.replace('\r', '').replace('\n', ''))
-
-                                szz_hunk = SzzHunk(old_lines=hunk.old_lines, old_start=hunk.old_start, patch=szz_patch,
-                                                   line_labels=line_labels)
-                                szz_hunks.append(szz_hunk)
+                diff = self.__scope.patches(commit.diff(git_repo))
+                if self.__scope.is_path_scoped and not diff:
+                    # path scoped run: the commit does not change any of the paths
+                    diff = None
+
+            if diff is not None:
+                # the diff is computed and traversed only once per commit
+                diff_analysis = DiffAnalysis(self.__basic_classifier, diff)
+                db_commit = Szz.commit_wrapper_to_commit(commit, diff_analysis, contributors)
+                output("commits", [i] + self.__commit_to_metadata(db_commit))
+                if not self.__scope.is_path_scoped:
+                    # the stats of path scoped runs only cover the files in scope, they are not those of the commit
+                    commit_index.add(db_commit, commit.message.split('\n')[0])
+                if i in issue_ids:
+                    issue_refs.append((commit.sha, issue_ids[i]))
+                for link_row in issue_links.get(i, []):
+                    output("issue_links", [i, self.__slug, commit.sha] + link_row)
+                closes_valid_issue = i in fixes
+
+                for commit_file, loc_ins, loc_del, lang in diff_analysis.files:
+                    output("commit_files", [i, self.__slug, commit.sha, commit_file, loc_ins, loc_del, lang])
+
+                if closes_valid_issue:
+                    szz_hunks += Szz.fix_hunks(self.__basic_classifier, commit, diff_analysis)
+
+            walked_shas.append(commit.sha)
+            if self.__checkpoint is not None and self.__checkpoint.due():
+                save_walk()
+
+        # the rest of a walk shorter than an interval is not saved, it would be walked again at most
+        if self.__checkpoint is not None and self.__checkpoint.outlasted():
+            save_walk()
         contributors = [(key, value) for key, value in contributors.items()]
-        return szz_hunks, commits, contributors, commit_files, issue_links
+        return szz_hunks, contributors, commit_index.entries, issue_refs
+
+    @staticmethod
+    def __partition_walk(self, git_repo: pygit2.Repository, walk: List[pygit2.Commit]) -> List[int]:
+        """Rank of the process that processes each commit of the walk, according to the partition strategy."""
+        if not self.__mpi_enabled:
+            return [0] * len(walk)
+        if self.__partition == WalkPartition.HASH:
+            return WalkPartition.hashed([str(commit.id) for commit in walk], self.__size)
+        if self.__partition != WalkPartition.COST:
+            return WalkPartition.contiguous(len(walk), self.__size)
+
+        # each process estimates the cost of an interleaved share of the walk, rank 0 balances them
+        start = time.time()
+        costs = [0 if str(commit.id) in self.__completed_shas else WalkPartition.estimate_cost(git_repo, commit)
+                 for commit in walk[self.__rank::self.__size]]
+        costs = self.__comm.gather(costs, root=0)
+        ranks = None
+        if self.__rank == 0:
+            walk_costs = [0] * len(walk)
+            for rank, rank_costs in enumerate(costs):
+                walk_costs[rank::self.__size] = rank_costs
+            ranks = WalkPartition.balanced(walk_costs, self.__size)
+            loads = WalkPartition.loads(ranks, walk_costs, self.__size)
+            Szz.__log_processing_time(self, "Walk cost estimate time", start)
+            log.info("Walk estimated load balance (max/mean cost): %.2f",
+                     max(loads) / max(sum(loads) / len(loads), 1))
+        return self.__comm.bcast(ranks, root=0)
 
     @staticmethod
-    def __make_output(self, commits, contributors, commit_files, issue_links):
+    def __run_pipeline(self, git_repo: pygit2.Repository, walk: List[pygit2.Commit], resumed_walk: List[Dict],
+                       resumed_blame: List[Dict]):
+        """
+        Pipelined mode: rank 0 hands out the walk in chunks, and the hunks found in each chunk are blamed by the
+        workers while the others are still walking. Returns the walk results of this process, as __inspect_walk
+        (with no hunks left to blame), the contributors of its blamed commits, and its busy time.
+        """
+        start = time.time()
+        scheduler = PipelineScheduler(self.__comm, self.__batch_size)
+        if self.__rank == 0:
+            log.info("Pipelined walk and blame, %d hunks per batch", self.__batch_size)
+            indexes = [i for i, commit in enumerate(walk) if str(commit.id) not in self.__completed_shas]
+            chunk_size = max(1, math.ceil(len(indexes) / ((self.__size - 1) * self.__WALK_CHUNKS_PER_WORKER)))
+            # the hunks of the job being resumed are queued first
+            resumed_hunks = itertools.chain.from_iterable(shard['szz_hunks'] for shard in resumed_walk)
+            scheduler.serve([indexes[i:i + chunk_size] for i in range(0, len(indexes), chunk_size)],
+                            Szz.__hunks_to_blame(self, resumed_hunks, resumed_blame))
+            for worker, (walk_chunks, blame_batches) in sorted(scheduler.served.items()):
+                log.info("Process %d received %d walk chunks and %d blame batches", worker, walk_chunks,
+                         blame_batches)
+            return [], [], {}, [], [], 0.0
+
+        contributors = {}
+        commit_index = {}
+        issue_refs = []
+        writers = Szz.__walk_writers(self)
+        # blamed commits are looked up in the commits walked so far, and in those walked by the previous runs
+        self.__commit_index = CommitIndex.load(self.__output_path("_commit_index.csv"))
+
+        def blame_batches():
+            # walk chunks are processed in between, as they come
+            task = scheduler.request()
+            while task is not None:
+                kind, work = task
+                if kind == PipelineScheduler.WALK:
+                    szz_hunks, chunk_contributors, chunk_index, chunk_refs = Szz.__inspect_walk(self, git_repo, walk,
+                                                                                                work, writers)
+                    contributors.update(chunk_contributors)
+                    commit_index.update(chunk_index)
+                    self.__commit_index.update(chunk_index)
+                    issue_refs.extend(chunk_refs)
+                    task = scheduler.request(szz_hunks)
+                else:
+                    yield work
+                    task = scheduler.request()
+
+        blame_contributors = self.__fetch_blamed_commits(blame_batches(), git_repo)
+        for writer in writers.values():
+            writer.close()
+        return ([], list(contributors.items()), commit_index, issue_refs, blame_contributors,
+                time.time() - start - scheduler.idle_time)
+
+    @staticmethod
+    def __make_output(self, contributors):
 
-        commits = list(itertools.chain.from_iterable(commits))
         contributors = list(itertools.chain.from_iterable(contributors))
-        commit_files = list(itertools.chain.from_iterable(commit_files))
-        issue_links = list(itertools.chain.from_iterable(issue_links))
 
         self.__contributors = {contributor[0]: SzzContributor(contributor[0], contributor[1][0], contributor[1][1]) for contributor in contributors}
 
-        log.info("Saving commits to csv")
-        commits_df = pd.DataFrame(commits, columns=self.__COMMIT_COLUMNS)
-        commits_df.to_csv(os.path.join(self.__output_folder, self.__slug_unslashed + "_commits.csv"), index=False)
-        log.info("Saving commits to csv - COMPLETED")
-
-        log.info("Saving commit files to csv")
-        commit_files_df = pd.DataFrame(commit_files,
-                                       columns=["SLUG", "SHA", "COMMIT_FILE", "LOC_INS", "LOC_DEL", "LANG"])
-        commit_files_df.to_csv(os.path.join(self.__output_folder, self.__slug_unslashed + "_commit_files.csv"),
-                               index=False)
-        log.info("Saving commit files to csv - COMPLETED")
-
-        log.info("Saving issue_links to csv")
-        issue_links_df = pd.DataFrame(issue_links,
-                                      columns=["SLUG", "COMMIT_SHA", "LINE_NUM", "ISSUE_NUMBER", "ISSUE_IS_PL",
-                                               "DELTA_OPEN", "DELTA_COLSED"])
-        issue_links_df.to_csv(os.path.join(self.__output_folder, self.__slug_unslashed + "_issue_links.csv"),
-                              index=False)
-        log.info("Saving issue_links to csv - COMPLETED")
+        if not self.__merge:
+            return
+        for name, (columns, sha_column) in self.__WALK_OUTPUTS.items():
+            log.info("Saving %s to csv", name)
+            rows = (row[1:] for row in ShardWriter.merge(self.__shard_folder, name, lambda row: int(row[0])))
+            Szz.__write_output(self, "_" + name + ".csv", columns, rows, Szz.__not_walked(self, columns, sha_column))
+            log.info("Saving %s to csv - COMPLETED", name)
+
+    def __not_walked(self, columns: List[str], sha_column: str):
+        """Keeps the rows of the previous run that come from commits not processed again."""
+        sha_index = columns.index(sha_column)
+        return lambda row: row[sha_index] not in self.__walked_shas
+
+    def __output_path(self, file_suffix: str) -> str:
+        """Path of an output file, given its suffix with the .csv extension, in the output format of the run."""
+        return os.path.join(self.__output_folder,
+                            utility.with_format(self.__slug_unslashed + file_suffix, self.__output_format))
+
+    @staticmethod
+    def __write_output(self, file_suffix: str, columns: List[str], rows, keep_previous=None):
+        """
+        Writes an output file from a stream of rows. In incremental mode, the rows of the previous run
+        accepted by keep_previous are appended.
+        """
+        file_path = self.__output_path(file_suffix)
+        if self.__last_head is not None and keep_previous is not None and os.path.exists(file_path):
+            rows = itertools.chain(rows, (row for row in utility.read_rows(file_path) if keep_previous(row)))
+        base_path, extension = os.path.splitext(file_path)
+        utility.write_rows(base_path + ".tmp" + extension, columns, rows, self.__COLUMN_TYPES)
+        os.replace(base_path + ".tmp" + extension, file_path)
+
+    @staticmethod
+    def __save_output(self, df: pd.DataFrame, file_suffix: str, sha_column: str = None,
+                      unique_column: str = None) -> pd.DataFrame:
+        """
+        Saves the output file. In incremental mode, the rows of the previous run are kept, except those
+        of the commits processed again and those with the same unique column value as a new row.
+        """
+        file_path = self.__output_path(file_suffix)
+        if self.__last_head is not None and os.path.exists(file_path):
+            previous_df = utility.read_table(file_path, dtype=str)
+            if sha_column is not None:
+                previous_df = previous_df[~previous_df[sha_column].isin(self.__walked_shas)]
+            df = pd.concat([df, previous_df], ignore_index=True)
+            if unique_column is not None:
+                df = df.drop_duplicates(subset=unique_column, keep='first')
+        utility.write_table(df, file_path)
+        return df
 
     @staticmethod
     def __log_processing_time(self, message, start):
@@ -285,132 +496,323 @@ class Szz:
         log.info(message + ": %.0f [ms]", processing_time)
 
     @staticmethod
-    def __hash_values(self, first: str, second: str):
+    def __hash_values(first: str, second: str):
         return hashlib.md5(bytes(first + second, "utf8")).hexdigest()
 
-    def __fetch_blamed_commits(self, szz_hunks, git_repo: pygit2.Repository) -> Dict[str, BlamedCommit]:
-        log.info("Process %d starts blame_commit_process", rank)
-        start = time.time()
+    @staticmethod
+    def __update_commit_index(self, commit_index_list: List[Dict[str, tuple]]):
+        """Merges the commits walked by each process into the index persisted by the previous runs, and saves it."""
+        index_path = self.__output_path("_commit_index.csv")
+        self.__commit_index = CommitIndex.load(index_path)
+        for entries in commit_index_list:
+            self.__commit_index.update(entries)
+        self.__commit_index.save(index_path, self.__slug)
+        log.info("Commit index size: %d", len(self.__commit_index))
 
-        blamed_commits = {}
-        contributors = {}
-        blame_counter = {}
+    @staticmethod
+    def __add_blamed_contributors(self, blamed_commit: CommitWrapper, contributors: Dict) -> Tuple[str, str]:
+        """Adds the author and the committer of a blamed commit to the contributors, and returns their ids."""
+        (blamed_author_name,
+         blamed_author_email) = blamed_commit.author
+        (blamed_author_name_l, blamed_author_email_l) = (
+            blamed_author_name.lower(), blamed_author_email.lower())
+
+        (blamed_committer_name,
+         blamed_committer_email) = blamed_commit.committer
+        (blamed_committer_name_l, blamed_committer_email_l) = (
+            blamed_committer_name.lower(), blamed_committer_email.lower())
+
+        blamed_author_id = Szz.__hash_values(blamed_author_name_l, blamed_author_email_l)
+        contributors[blamed_author_id] = (blamed_author_name_l, blamed_author_email_l)
+
+        blamed_committer_id = Szz.__hash_values(blamed_committer_name_l, blamed_committer_email_l)
+        contributors[blamed_committer_id] = (blamed_committer_name_l, blamed_committer_email_l)
+        return blamed_author_id, blamed_committer_id
+
+    def __blamed_commit(self, blamed_sha: str, git_repo: pygit2.Repository, contributors: Dict):
+        """Returns the metadata of a blamed commit, or None if it touches too many files or lines."""
+        blamed_commit = self.__commit_index.get(blamed_sha)
+        if blamed_commit is not None:
+            # stats already computed during the walk, no need to diff again
+            if blamed_commit.num_files_changed >= self.__max_num_files_changed:
+                return None
+            if blamed_commit.num_additions and blamed_commit.num_additions >= self.__max_new_lines:
+                return None
+            # the index has the ids only: the names and emails are read from the commit, which is not diffed
+            if blamed_commit.author_id not in contributors or blamed_commit.committer_id not in contributors:
+                Szz.__add_blamed_contributors(self, CommitWrapper(git_repo.revparse_single(blamed_sha)), contributors)
+            return blamed_commit
+
+        blamed_commit = CommitWrapper(git_repo.revparse_single(blamed_sha))
+
+        blamed_parents = blamed_commit.parents
+        blamed_num_parents = len(blamed_parents)
+
+        if not blamed_num_parents:
+            ins = None
+            dels = None
+            num_files = None
+        else:
+            blamed_diff = DiffAnalysis(self.__basic_classifier, blamed_commit.diff(git_repo))
+            ins = blamed_diff.insertions
+            dels = blamed_diff.deletions
+            num_files = blamed_diff.files_changed
+
+        if num_files is None or num_files >= self.__max_num_files_changed:
+            return None
+
+        if ins and ins >= self.__max_new_lines:
+            return None
+
+        blamed_authored_datetime = blamed_commit.authored_date
+
+        blamed_author_id, blamed_committer_id = Szz.__add_blamed_contributors(self, blamed_commit, contributors)
+
+        blamed_message = blamed_commit.message
+        blamed_first_msg_line = blamed_message.split('\n')[0]
+
+        return BlamedCommit(blamed_sha,
+                            blamed_authored_datetime,
+                            blamed_author_id,
+                            blamed_committer_id,
+                            blamed_first_msg_line,
+                            blamed_num_parents,
+                            ins,
+                            dels,
+                            num_files,
+                            blamed_diff.all_files,
+                            blamed_diff.src_loc_added,
+                            blamed_diff.src_loc_deleted,
+                            blamed_diff.num_src_files_touched,
+                            blamed_diff.src_files)
 
+    @staticmethod
+    def __blame(git_repo: pygit2.Repository, line_index: LineIndex, path: str, sha_parent: str, min_line: int,
+                max_line: int):
+        """
+        Blames the given line range as a list of (blamed sha, start line, number of lines),
+        with libgit2 or, if given, with the line index.
+        """
+        if line_index is not None:
+            return line_index.blame(git_repo, path, sha_parent, min_line, max_line)
+        return [(str(bh.final_commit_id), bh.final_start_line_number, bh.lines_in_hunk) for bh in
+                git_repo.blame(path, newest_commit=sha_parent, min_line=min_line, max_line=max_line)]
+
+    @staticmethod
+    def __blame_range(group: List[SzzHunk]):
+        """Union of the line ranges of a group of hunks, blamed with a single call."""
+        return (min(hunk.old_start for hunk in group),
+                max(hunk.old_start + hunk.old_lines - 1 for hunk in group))
+
+    @staticmethod
+    def __overlapping_shas(group: List[SzzHunk], blame_hunks) -> List[str]:
+        """Commits blamed for at least one line of a hunk of the group, rather than for the lines in between."""
+        shas = {}
+        for blamed_sha, final_start_line_number, lines_in_hunk in blame_hunks:
+            for hunk in group:
+                if max(final_start_line_number, hunk.old_start) <= min(final_start_line_number + lines_in_hunk - 1,
+                                                                       hunk.old_start + hunk.old_lines - 1):
+                    shas[blamed_sha] = True
+                    break
+        return list(shas)
+
+    @staticmethod
+    def __group_hunks(szz_hunks) -> List[List[SzzHunk]]:
+        """Groups hunks by (old file, parent commit), preserving the order in which groups are first seen."""
+        groups = {}
         for hunk in szz_hunks:
+            groups.setdefault((hunk.patch.old_file, hunk.patch.commit.sha_parent), []).append(hunk)
+        return list(groups.values())
 
-            line_labels = hunk.line_labels
-
-            try:
-                for bh in git_repo.blame(hunk.patch.old_file, newest_commit=hunk.patch.commit.sha_parent,
-                                         min_line=hunk.old_start, max_line=hunk.old_start + hunk.old_lines - 1):
-                    blamed_sha = str(bh.final_commit_id)
-                    if blamed_sha not in blamed_commits:
-                        try:
-                            blamed_commit = CommitWrapper(git_repo.revparse_single(blamed_sha))
-
-                            blamed_parents = blamed_commit.parents
-                            blamed_num_parents = len(blamed_parents)
-
-                            if not blamed_num_parents:
-                                ins = None
-                                dels = None
-                                num_files = None
-                            else:
-                                blamed_diff = blamed_commit.diff(git_repo)
-                                ins = blamed_diff.stats.insertions
-                                dels = blamed_diff.stats.deletions
-                                num_files = blamed_diff.stats.files_changed
-
-                            if num_files is None or num_files >= self.__max_num_files_changed:
-                                continue
-
-                            if ins and ins >= self.__max_new_lines:
-                                continue
-
-                            blamed_authored_datetime = blamed_commit.authored_date
-
-                            (blamed_author_name,
-                             blamed_author_email) = blamed_commit.author
-                            (blamed_author_name_l, blamed_author_email_l) = (
-                                blamed_author_name.lower(), blamed_author_email.lower())
-
-                            (blamed_committer_name,
-                             blamed_committer_email) = blamed_commit.committer
-                            (blamed_committer_name_l, blamed_committer_email_l) = (
-                                blamed_committer_name.lower(), blamed_committer_email.lower())
-
-                            if (blamed_author_name_l, blamed_author_email_l) not in contributors:
-                                blamed_author_id = Szz.__hash_values(self, blamed_author_name_l, blamed_author_email_l)
-                                contributors[blamed_author_id] = (blamed_author_name_l, blamed_author_email_l)
-
-                            if (blamed_committer_name_l, blamed_committer_email_l) not in contributors:
-                                blamed_committer_id = Szz.__hash_values(self, blamed_committer_name_l,
-                                                                        blamed_committer_email_l)
-                                contributors[blamed_committer_id] = (blamed_committer_name_l, blamed_committer_email_l)
-
-                            blamed_message = blamed_commit.message
-                            blamed_first_msg_line = blamed_message.split('\n')[0]
-
-                            # get info about changes to src files in the new blamed commit
-                            all_files, src_files, num_src_files_touched, src_loc_added, src_loc_deleted = \
-                                CommitWrapper.get_src_changes(self.__basic_classifier,
-                                                              blamed_commit.diff(git_repo))
-
-                            blamed_commit = BlamedCommit(blamed_sha,
-                                                         blamed_authored_datetime,
-                                                         blamed_author_id,
-                                                         blamed_committer_id,
-                                                         blamed_first_msg_line,
-                                                         blamed_num_parents,
-                                                         ins,
-                                                         dels,
-                                                         num_files,
-                                                         all_files,
-                                                         src_loc_added,
-                                                         src_loc_deleted,
-                                                         num_src_files_touched,
-                                                         src_files)
-
-                            blamed_commits[blamed_sha] = (blamed_commit, hunk)
-
-                        except Exception as e:
-                            log.error(
-                                msg="{0}: revparse error {1}:\t{2}".format(self.__repo_path, blamed_sha, e))
-                            traceback.print_exc()
-
-                    for line_num in range(bh.final_start_line_number,
-                                          bh.final_start_line_number + bh.lines_in_hunk):
-                        if line_labels[line_num] == self.__basic_classifier.CG_CODE:
-                            blame_counter.setdefault(blamed_sha, 0)
-                            blame_counter[blamed_sha] += 1
-
-            except Exception as e:
-                log.error("Exception in blame.")
-                traceback.print_exc()
-                continue
+    @staticmethod
+    def __hunks_to_blame(self, szz_hunks, resumed_blame: List[Dict]) -> List[List[SzzHunk]]:
+        """Groups the hunks to blame, leaving out those already blamed by the job being resumed."""
+        # hunks of the same (file, parent commit) are kept together, so that they are blamed with a single call
+        hunk_groups = Szz.__group_hunks(szz_hunks)
+        if resumed_blame:
+            blamed_hunks = set(itertools.chain.from_iterable(shard['groups'] for shard in resumed_blame))
+            hunk_groups = [[hunk for hunk in group if (hunk.patch.old_file, hunk.patch.commit.sha_parent,
+                                                        hunk.patch.commit.sha) not in blamed_hunks]
+                           for group in hunk_groups]
+            hunk_groups = [group for group in hunk_groups if group]
+            log.info("Groups of hunks left to blame: %d", len(hunk_groups))
+        return hunk_groups
 
-        blames = []
+    @staticmethod
+    def __blame_sort_key(row: List[str]):
+        return row[1], row[2], row[3], row[4]  # fixing commit, path, type, blamed commit
 
-        for blamed_sha, num_lines in blame_counter.items():
-            blamed_commit, hunk = blamed_commits.get(blamed_sha)
-            if blamed_commit:
-                blames.append(Blame(hunk.patch.commit.sha, hunk.patch.old_file, hunk.patch.label, blamed_commit, num_lines))
+    @staticmethod
+    def __blamed_sort_key(row: List[str]):
+        return row[1]  # sha
+
+    def __fetch_blamed_commits(self, hunk_batches, git_repo: pygit2.Repository) -> List[SzzContributor]:
+        log.info("Process %d starts blame_commit_process", self.__rank)
+        start = time.time()
+
+        blamed_commits = {}
+        contributors = {}
+        num_blames = 0
+        blamed_groups = []
+        saved = [0]  # number of groups already checkpointed
+        blames = ShardWriter(self.__shard_folder, "blames_commit", self.__rank, self.__BLAME_COLUMNS,
+                             Szz.__blame_sort_key)
+        blamed = ShardWriter(self.__shard_folder, "blamed_commit", self.__rank, self.__COMMIT_COLUMNS,
+                             Szz.__blamed_sort_key)
+        written_blamed = set()
+        pending_blames = []  # rows not checkpointed yet
+        pending_blamed = []
+        num_hunks = 0
+        num_blame_calls = 0
+        blame_cache = None
+        if self.__blame_cache:
+            blame_cache = BlameCache(os.path.join(self.__output_folder, self.__slug_unslashed + "_blame_cache.sqlite"))
+
+        def save_blames():
+            self.__checkpoint.save(Checkpoint.BLAME, {'groups': blamed_groups[saved[0]:], 'blames': pending_blames,
+                                                      'blamed': pending_blamed, 'contributors': dict(contributors)})
+            saved[0] = len(blamed_groups)
+            pending_blames.clear()
+            pending_blamed.clear()
+
+        # the line index is shared by the threads, so that each file is annotated once
+        line_index = LineIndex() if self.__blame_engine == LineIndex.INDEX else None
+        repos = threading.local()
+        pool = ThreadPoolExecutor(self.__blame_threads) if self.__blame_threads > 1 else None
+
+        def blame_group(group, blame_hunks):
+            """
+            Blames a group of hunks, unless cached, and fetches the metadata of the commits blamed for the first time.
+            With a thread pool, it runs in the threads, each one with its own repository handle.
+            """
+            repo = git_repo
+            if pool is not None:
+                if not hasattr(repos, 'repo'):
+                    repos.repo = pygit2.Repository(git_repo.path)
+                repo = repos.repo
+            if blame_hunks is None:
+                group_patch = group[0].patch
+                min_line, max_line = Szz.__blame_range(group)
+                try:
+                    blame_hunks = Szz.__blame(repo, line_index, group_patch.old_file, group_patch.commit.sha_parent,
+                                              min_line, max_line)
+                except Exception as e:
+                    log.error("Exception in blame.")
+                    traceback.print_exc()
+                    return None
+            new_commits = {}
+            new_contributors = {}
+            for blamed_sha in Szz.__overlapping_shas(group, blame_hunks):
+                if blamed_sha not in blamed_commits and blamed_sha not in new_commits:
+                    try:
+                        # filtered out commits are stored as None, not to look them up again
+                        new_commits[blamed_sha] = self.__blamed_commit(blamed_sha, repo, new_contributors)
+                    except Exception as e:
+                        log.error(
+                            msg="{0}: revparse error {1}:\t{2}".format(self.__repo_path, blamed_sha, e))
+                        traceback.print_exc()
+            return blame_hunks, new_commits, new_contributors
+
+        def blamed_groups_in_order():
+            """Yields the groups of hunks in order, with their blame, computed by the threads ahead of time."""
+            ahead = 2 * self.__blame_threads if pool is not None else 1  # groups blamed or being blamed
+            in_flight = deque()
+            for szz_hunks in hunk_batches:
+                for group in Szz.__group_hunks(szz_hunks):
+                    # the cache is only used by this thread
+                    cached = None
+                    if blame_cache is not None:
+                        cached = blame_cache.get(group[0].patch.old_file, group[0].patch.commit.sha_parent,
+                                                 *Szz.__blame_range(group))
+                    in_flight.append((group, cached, blame_group(group, cached) if pool is None else
+                                      pool.submit(blame_group, group, cached)))
+                    while len(in_flight) >= ahead:
+                        group, cached, result = in_flight.popleft()
+                        yield group, cached, result if pool is None else result.result()
+            for group, cached, result in in_flight:
+                yield group, cached, result if pool is None else result.result()
+
+        for group, cached, result in blamed_groups_in_order():
+            num_hunks += len(group)
+            num_blame_calls += 1
+            """
+            all the hunks of a file changed by a fixing commit are blamed at once,
+            over the union of their line ranges, and the result is then sliced back per hunk
+            """
+            group_patch = group[0].patch
+            if result is None:
+                continue
+            blame_hunks, new_commits, new_contributors = result
+            if blame_cache is not None and cached is None:
+                blame_cache.put(group_patch.old_file, group_patch.commit.sha_parent, *Szz.__blame_range(group),
+                                blame_hunks)
+            for blamed_sha, blamed_commit in new_commits.items():
+                blamed_commits.setdefault(blamed_sha, blamed_commit)
+            contributors.update(new_contributors)
+
+            blame_counter = {}
+            for hunk in group:
+                hunk_end = hunk.old_start + hunk.old_lines - 1
+
+                for blamed_sha, final_start_line_number, lines_in_hunk in blame_hunks:
+                    first_line = max(final_start_line_number, hunk.old_start)
+                    last_line = min(final_start_line_number + lines_in_hunk - 1, hunk_end)
+                    if first_line > last_line:
+                        continue
+
+                    if blamed_commits.get(blamed_sha) is None:
+                        continue
+
+                    # count per (fixing commit, file), so that results do not depend on how hunks are spread over ranks
+                    blame_key = (hunk.patch.commit.sha, hunk.patch.old_file, hunk.patch.label, blamed_sha)
+                    code_lines = hunk.code_lines(first_line, last_line)
+                    if code_lines:
+                        blame_counter[blame_key] = blame_counter.get(blame_key, 0) + code_lines
+
+            for (sha, old_file, label, blamed_sha), num_lines in blame_counter.items():
+                blame_row = [self.__slug, sha, old_file, label, blamed_sha, num_lines]
+                blames.write(blame_row)
+                num_blames += 1
+                if blamed_sha not in written_blamed:
+                    # each process writes a blamed commit once, duplicates across processes are merged later
+                    written_blamed.add(blamed_sha)
+                    blamed_row = self.__commit_to_metadata(blamed_commits[blamed_sha])
+                    blamed.write(blamed_row)
+                    if self.__checkpoint is not None:
+                        pending_blamed.append(blamed_row)
+                if self.__checkpoint is not None:
+                    pending_blames.append(blame_row)
+            # a group may hold the hunks of several fixing commits with the same parent, each one is recorded
+            blamed_groups.extend(sorted({(group_patch.old_file, group_patch.commit.sha_parent,
+                                          hunk.patch.commit.sha) for hunk in group}))
+            if self.__checkpoint is not None and self.__checkpoint.due():
+                save_blames()
+
+        if pool is not None:
+            pool.shutdown()
+        if self.__checkpoint is not None and self.__checkpoint.outlasted():
+            save_blames()
+        blames.close()
+        blamed.close()
+
+        if blame_cache is not None:
+            blame_cache.close()
+            log.info("Process %d blame cache hits: %d, misses: %d", self.__rank, blame_cache.hits, blame_cache.misses)
 
         result_contributors = [SzzContributor(key, value[0], value[1]) for key, value in contributors.items()]
-        log.info("Process %d give %d blames", rank, len(blames))
-        Szz.__log_processing_time(self, "Process %d blame_commit elapsed time" % rank, start)
+        log.info("Process %d blamed %d hunks with %d blame calls", self.__rank, num_hunks, num_blame_calls)
+        log.info("Process %d give %d blames", self.__rank, num_blames)
+        Szz.__log_processing_time(self, "Process %d blame_commit elapsed time" % self.__rank, start)
 
-        return blames, result_contributors
+        return result_contributors
 
-    def __export_csv(self, blames_list: List[List[Blame]], contributors_list: List[List[SzzContributor]]):
+    def __export_csv(self, contributors_list: List[List[SzzContributor]]):
         start = time.time()
-        blame_metadata = []
-        blamed_metadata = []
 
-        for blame in list(itertools.chain.from_iterable(blames_list)):
-            blamed = blame.blamed
-            blame_metadata.append([self.__slug, blame.sha, blame.old_file, blame.label, blamed.sha, blame.num_lines])
-            blamed_metadata.append(self.__commit_to_metadata(blamed))
+        if self.__merge:
+            Szz.__merge_blames(self)
+        else:
+            log.info("Output shards left in %s", self.__shard_folder)
 
         contributors = {contributor.id: contributor for contributor in
                         list(itertools.chain.from_iterable(contributors_list))}
@@ -423,104 +825,319 @@ class Szz:
                                           contributor in
                                           received_contributors]
 
-        blame_df = pd.DataFrame(blame_metadata,
-                                columns=["SLUG", "BUG_FIXING_COMMIT", "PATH", "TYPE", "BLAMED_COMMIT",
-                                         "NUM_BLAMED_LINES"])
-        blame_df.to_csv(os.path.join(self.__output_folder, self.__slug_unslashed + "_blames_commit.csv"), index=False)
-        del blame_df
-
-        blamed_df = pd.DataFrame(blamed_metadata,
-                                 columns=self.__COMMIT_COLUMNS)
-        blamed_df.to_csv(os.path.join(self.__output_folder, self.__slug_unslashed + "_blamed_commit.csv"), index=False)
-        del blamed_df
-
         contributors_df = pd.DataFrame(received_contributors_metadata,
                                        columns=["SLUG", "CONTRIBUTOR_ID", "NAME", "EMAIL"])
-        contributors_df.to_csv(os.path.join(self.__output_folder, self.__slug_unslashed + "_contributors.csv"),
-                               index=False)
+        Szz.__save_output(self, contributors_df, "_contributors.csv", unique_column="CONTRIBUTOR_ID")
 
         Szz.__log_processing_time(self, "CSV export processing time", start)
 
-    def __get_repo(self, copy: bool = False) -> pygit2.Repository:
-        git_path = self.__repo_path
-        if copy and rank > 0:
-            git_path = os.path.join(temp_folder, self.__slug_unslashed + "/" + str(rank).zfill(Szz.__calculate_fill(self)))
-            #git_path = os.path.join(expanduser("~"), self.__slug_unslashed + "_" + str(rank).zfill(Szz.__calculate_fill(self)))
-            log.info("Copying repo in path: %s" % git_path)
-            utility.create_folder_if_not_exists(self.__repo_path, git_path)
+    @staticmethod
+    def __merge_blames(self):
+        """Merges the blame shards of all processes, sorted by fixing commit, path, type and blamed commit."""
+        def merged_blames():
+            rows = ShardWriter.merge(self.__shard_folder, "blames_commit", Szz.__blame_sort_key)
+            for _, group in itertools.groupby(rows, Szz.__blame_sort_key):
+                # the same lines may have been blamed by different processes (e.g., in a resumed job), sum them up
+                row = next(group)
+                for other in group:
+                    row = row[:5] + [str(int(row[5]) + int(other[5]))]
+                yield row
+
+        Szz.__write_output(self, "_blames_commit.csv", self.__BLAME_COLUMNS, merged_blames(),
+                        Szz.__not_walked(self, self.__BLAME_COLUMNS, "BUG_FIXING_COMMIT"))
+
+        referenced = None
+        if self.__last_head is not None:
+            # rows of the previous run are kept for the blamed commits still referenced by a blame
+            referenced = set(utility.read_table(self.__output_path("_blames_commit.csv"), dtype=str,
+                                                usecols=["BLAMED_COMMIT"])["BLAMED_COMMIT"])
+        written = set()
+
+        def merged_blamed():
+            rows = ShardWriter.merge(self.__shard_folder, "blamed_commit", Szz.__blamed_sort_key)
+            for sha, group in itertools.groupby(rows, Szz.__blamed_sort_key):
+                if referenced is None or sha in referenced:
+                    written.add(sha)
+                    yield next(group)
+
+        def keep_blamed(row):
+            if row[1] in referenced and row[1] not in written:
+                written.add(row[1])
+                return True
+            return False
+
+        Szz.__write_output(self, "_blamed_commit.csv", self.__COMMIT_COLUMNS, merged_blamed(), keep_blamed)
+
+    def __log_load_balance(self, phase: str, busy: float, elapsed: float):
+        timings = [(busy, elapsed)]
+        if self.__mpi_enabled:
+            timings = self.__comm.gather((busy, elapsed), root=0)
+        if self.__rank == 0:
+            wall = max(e for _, e in timings)
+            for r, (b, _) in enumerate(timings):
+                log.info("Process %d %s busy time: %.0f [ms], idle time: %.0f [ms]", r, phase, b * 1000,
+                         (wall - b) * 1000)
+            busy_times = [b for b, _ in timings if b > 0]
+            if busy_times:
+                log.info("%s load balance (max/mean busy time): %.2f", phase.capitalize(),
+                         max(busy_times) / (sum(busy_times) / len(busy_times)))
+
+    def __get_repo(self) -> pygit2.Repository:
+        """
+        All the processes read from the same object store, which is never written (except by the preparation of the
+        clone, before it is opened). If a scratch dir is given, the object store is first copied there once per node,
+        and the processes of the node open that copy.
+        """
+        if self.__prepare:
+            # the clone is repacked before any process opens it
+            if self.__rank == 0:
+                benchmark = RepoPreparer.prepare(self.__repo_path)
+                if benchmark is not None:
+                    log.info("Walk of %d commits: %.2f [s] before preparing the clone, %.2f [s] after", *benchmark)
+            if self.__mpi_enabled:
+                self.__comm.Barrier()
+        git_path = pygit2.Repository(self.__repo_path).path
+        if self.__scratch_dir is not None:
+            node_git_path = os.path.join(self.__scratch_dir, self.__slug_unslashed, ".git")
+            self.__node_comm = self.__comm.Split_type(LocalComm.api(self.__comm).COMM_TYPE_SHARED)
+            if self.__node_comm.Get_rank() == 0:
+                log.info("Process %d copying repo object store in path: %s", self.__rank, node_git_path)
+                utility.create_folder_if_not_exists(git_path, node_git_path)
+            self.__node_comm.Barrier()
+            git_path = node_git_path
+        log.info("Process %d opening repo at path: %s", self.__rank, git_path)
         return pygit2.Repository(git_path)
 
-    @staticmethod
-    def __calculate_fill(self) -> int:
-        fill = 2
-        dividend = 10
-        actual = mpisize / dividend
-        while actual >= dividend:
-            fill += 1
-            dividend *= 10
-        return fill
+    def __release_repo(self):
+        """Deletes the node copy of the repo, once all the processes of the node are done with it."""
+        if self.__node_comm is not None:
+            self.__node_comm.Barrier()
+            if self.__node_comm.Get_rank() == 0:
+                utility.delete_folder_if_exists(os.path.join(self.__scratch_dir, self.__slug_unslashed))
+            self.__node_comm.Free()
+            self.__node_comm = None
 
     def run(self):
-        git_repo = self.__get_repo(self.__mpi_enabled)
+        git_repo = self.__get_repo()
+        dynamic_schedule = self.__schedule == 'dynamic' and self.__mpi_enabled
+        pipelined = self.__schedule == 'pipelined' and self.__mpi_enabled
         start = None
         start_hunk_fetch = None
 
-        if rank == 0:
+        if self.__rank == 0:
             start = time.time()
-            log.info("Executing SZZ in MPI mode: " + str(self.__mpi_enabled))
+            log.info("Executing SZZ with %d %s processes", self.__size,
+                     "local" if isinstance(self.__comm, LocalComm) else "MPI")
             log.info("Processing repository at path %s", self.__repo_path)
             start_hunk_fetch = time.time()
 
-        szz_hunks, commits, contributors, commit_files, issue_links = Szz.__inspect_walk(self, git_repo)
-
-        szz_hunks = comm.gather(szz_hunks, root=0)
-        commits = comm.gather(commits, root=0)
-        contributors = comm.gather(contributors, root=0)
-        commit_files = comm.gather(commit_files, root=0)
-        issue_links = comm.gather(issue_links, root=0)
-
-        if rank == 0:
-            szz_hunks = list(itertools.chain.from_iterable(szz_hunks))
-            total_hunks = len(szz_hunks)
-            log.info("Total hunks to process: %d", total_hunks)
-            szz_hunks = np.array_split(szz_hunks, mpisize)
-            Szz.__log_processing_time(self, "Hunks fetching time", start_hunk_fetch)
-            Szz.__make_output(self, commits, contributors, commit_files, issue_links)
-
+        state = None
+        walk_bounds = (None, [])
+        resumed_walk = []
+        resumed_blame = []
+        checkpoint_info = (None, set(), None, None)
+        if self.__rank == 0:
+            head = str(git_repo.head.target)
+            resume_error = None
+            if self.__resume:
+                resumed_walk = Checkpoint.load(self.__checkpoint_folder, Checkpoint.WALK)
+                resumed_blame = Checkpoint.load(self.__checkpoint_folder, Checkpoint.BLAME)
+                log.info("Resuming from %d walk and %d blame checkpoint shards", len(resumed_walk),
+                         len(resumed_blame))
+                # the shards refer to the commits by their position in the walk from the HEAD of the job resumed
+                checkpoint_heads = Checkpoint.heads(resumed_walk + resumed_blame)
+                if checkpoint_heads - {head}:
+                    resume_error = "Cannot resume: the checkpoints were saved walking from %s, HEAD is now %s" % (
+                        ", ".join(str(checkpoint_head) for checkpoint_head in checkpoint_heads), head)
+            else:
+                utility.delete_folder_if_exists(self.__checkpoint_folder)
+            if self.__checkpoint_interval > 0:
+                os.makedirs(self.__checkpoint_folder, exist_ok=True)
+            # shards left by a previous job are rewritten from the checkpoints, when resuming
+            utility.delete_folder_if_exists(self.__shard_folder)
+            os.makedirs(self.__shard_folder, exist_ok=True)
+            checkpoint_info = (time.strftime("%Y%m%d%H%M%S"),
+                               set(itertools.chain.from_iterable(shard['shas'] for shard in resumed_walk)), head,
+                               resume_error)
+            state = SzzState.load(self.__state_path)
+            if self.__incremental and state.head is not None:
+                if not os.path.exists(self.__output_path("_commits.csv")):
+                    log.warning("Outputs of the previous run not found in %s format, processing the whole history",
+                                self.__output_format)
+                elif state.head in git_repo:
+                    changed_issues = state.changed_issues(self.__issues_dict)
+                    walk_bounds = (state.head, sorted(state.commits_referencing(changed_issues)))
+                    log.info("Incremental run from commit %s, %d changed issues, %d commits to evaluate again",
+                             state.head, len(changed_issues), len(walk_bounds[1]))
+                else:
+                    log.warning("Commit %s of the previous run not found, processing the whole history", state.head)
         if self.__mpi_enabled:
-            szz_hunks = comm.scatter(szz_hunks, root=0)
+            walk_bounds = self.__comm.bcast(walk_bounds, root=0)
+            checkpoint_info = self.__comm.bcast(checkpoint_info, root=0)
+        self.__last_head, self.__reevaluated_shas = walk_bounds
+        run_id, self.__completed_shas, head, resume_error = checkpoint_info
+        if resume_error is not None:
+            raise ValueError(resume_error)
+        if self.__checkpoint_interval > 0:
+            self.__checkpoint = Checkpoint(self.__checkpoint_folder, run_id, self.__rank, self.__checkpoint_interval,
+                                           head)
+
+        start_walk = time.time()
+        walk = Szz.__walk_commits(self, git_repo)
+        if pipelined:
+            (szz_hunks, contributors, commit_index, issue_refs, blame_contributors,
+             busy) = Szz.__run_pipeline(self, git_repo, walk, resumed_walk, resumed_blame)
+            self.__log_load_balance("pipeline", busy, time.time() - start_walk)
         else:
-            szz_hunks = itertools.chain.from_iterable(szz_hunks)
+            ranks = Szz.__partition_walk(self, git_repo, walk)
+            writers = Szz.__walk_writers(self)
+            szz_hunks, contributors, commit_index, issue_refs = Szz.__inspect_walk(
+                self, git_repo, walk, [i for i, rank in enumerate(ranks) if rank == self.__rank], writers)
+            for writer in writers.values():
+                writer.close()
+            walk_time = time.time() - start_walk
+            self.__log_load_balance("walk", walk_time, walk_time)
+
+        start_gather = time.time()
+        transport = ColumnarTransport(self.__comm)
+        szz_hunks = transport.gather(ColumnarTransport.encode_hunks(szz_hunks))
+        contributors = transport.gather(ColumnarTransport.encode_rows(
+            [(key, name, email) for key, (name, email) in contributors], ColumnarTransport.CONTRIBUTOR_KINDS))
+        commit_index = transport.gather(ColumnarTransport.encode_commit_index(commit_index))
+        issue_refs = transport.gather(ColumnarTransport.encode_rows(
+            [(sha, issue_id) for sha, issue_ids in issue_refs for issue_id in issue_ids],
+            ColumnarTransport.ISSUE_REF_KINDS))
+
+        if self.__rank == 0:
+            szz_hunks = [ColumnarTransport.decode_hunks(buffer) for buffer in szz_hunks]
+            contributors = [[(key, (name, email)) for key, name, email in ColumnarTransport.decode_rows(buffer)]
+                            for buffer in contributors]
+            commit_index = [ColumnarTransport.decode_commit_index(buffer) for buffer in commit_index]
+            issue_refs = [[(sha, [issue_id for _, issue_id in refs])
+                           for sha, refs in itertools.groupby(ColumnarTransport.decode_rows(buffer), lambda r: r[0])]
+                          for buffer in issue_refs]
+            Szz.__log_processing_time(self, "Walk results gathering time", start_gather)
+            # checkpoint shards are not in walk order, so the resumed rows are sorted by walk index
+            resumed_writers = {name: ShardWriter(self.__shard_folder, name, "resumed", ["WALK_INDEX"] + columns,
+                                                 lambda row: int(row[0]))
+                               for name, (columns, _) in self.__WALK_OUTPUTS.items()}
+            for shard in resumed_walk:
+                szz_hunks.append(shard['szz_hunks'])
+                contributors.append(list(shard['contributors'].items()))
+                commit_index.append(shard['commit_index'])
+                issue_refs.append(shard['issue_refs'])
+                for name, writer in resumed_writers.items():
+                    writer.write_all(shard[name])
+            for writer in resumed_writers.values():
+                writer.close()
+            Szz.__update_commit_index(self, commit_index)
+            if not self.__scope.scoped:
+                # a scoped run does not cover the history up to its HEAD, incremental runs cannot start from it
+                state.update(str(git_repo.head.target), self.__issues_dict, itertools.chain.from_iterable(issue_refs))
+            if not pipelined:
+                # in pipelined mode, the hunks have already been blamed
+                szz_hunks = list(itertools.chain.from_iterable(szz_hunks))
+                log.info("Total hunks to process: %d", len(szz_hunks))
+                hunk_groups = Szz.__hunks_to_blame(self, szz_hunks, resumed_blame)
+                if dynamic_schedule:
+                    log.info("Blame scheduling: dynamic, %d hunks per batch", self.__batch_size)
+                    szz_hunks = hunk_groups
+                else:
+                    szz_hunks = [list(itertools.chain.from_iterable(hunk_groups[i] for i in indexes))
+                                 for indexes in np.array_split(np.arange(len(hunk_groups)), self.__size)]
+            Szz.__log_processing_time(self, "Hunks fetching time", start_hunk_fetch)
+            Szz.__make_output(self, contributors)
 
-        blamed_commits = []
-        contributors = []
-        if szz_hunks is not None:
-            blamed_commits, contributors = self.__fetch_blamed_commits(szz_hunks, git_repo)
+        if self.__mpi_enabled and not pipelined:
+            buffer = ColumnarTransport.encode_commit_index(self.__commit_index.entries) if self.__rank == 0 else None
+            self.__commit_index = CommitIndex(ColumnarTransport.decode_commit_index(transport.bcast(buffer)))
+
+        if pipelined:
+            contributors = blame_contributors
+        else:
+            contributors = Szz.__run_blame(self, git_repo, szz_hunks, dynamic_schedule, transport)
 
-        received_data_blamed = [blamed_commits]
         received_data_contributors = [contributors]
         if self.__mpi_enabled:
-            received_data_blamed = comm.gather(blamed_commits, root=0)
-            received_data_contributors = comm.gather(contributors, root=0)
-
-        if rank == 0:
+            received_data_contributors = transport.gather(ColumnarTransport.encode_rows(
+                [(c.id, c.name, c.email) for c in contributors], ColumnarTransport.CONTRIBUTOR_KINDS))
+            if self.__rank == 0:
+                received_data_contributors = [[SzzContributor(*row) for row in ColumnarTransport.decode_rows(buffer)]
+                                              for buffer in received_data_contributors]
+
+        if self.__rank == 0:
+            resumed_blames = ShardWriter(self.__shard_folder, "blames_commit", "resumed", self.__BLAME_COLUMNS,
+                                         Szz.__blame_sort_key)
+            resumed_blamed = ShardWriter(self.__shard_folder, "blamed_commit", "resumed", self.__COMMIT_COLUMNS,
+                                         Szz.__blamed_sort_key)
+            for shard in resumed_blame:
+                resumed_blames.write_all(shard['blames'])
+                resumed_blamed.write_all(shard['blamed'])
+                received_data_contributors.append(
+                    [SzzContributor(key, value[0], value[1]) for key, value in shard['contributors'].items()])
+            resumed_blames.close()
+            resumed_blamed.close()
             Szz.__log_processing_time(self, "Blamed commits. Total processing time", start)
-            self.__export_csv(received_data_blamed, received_data_contributors)
+            self.__export_csv(received_data_contributors)
+            if not self.__scope.scoped:
+                state.save(self.__state_path)
+            utility.delete_folder_if_exists(self.__checkpoint_folder)
+            if self.__merge:
+                utility.delete_folder_if_exists(self.__shard_folder)
+
+        self.__release_repo()
+
+    @staticmethod
+    def __run_blame(self, git_repo: pygit2.Repository, szz_hunks, dynamic_schedule: bool,
+                    transport: ColumnarTransport) -> List[SzzContributor]:
+        """Blame phase, after the walk: rank 0 holds the hunks to blame, grouped for the dynamic schedule."""
+        contributors = []
+        busy = 0.0
+        start_blame = time.time()
+        if dynamic_schedule:
+            scheduler = BlameScheduler(self.__comm, self.__batch_size)
+            if self.__rank == 0:
+                scheduler.serve(szz_hunks)
+                for worker, num_batches in sorted(scheduler.served.items()):
+                    log.info("Process %d received %d batches", worker, num_batches)
+            else:
+                contributors = self.__fetch_blamed_commits(scheduler.batches(), git_repo)
+                busy = time.time() - start_blame - scheduler.idle_time
+        else:
             if self.__mpi_enabled:
-                utility.delete_folder_if_exists(temp_folder)
+                buffers = [ColumnarTransport.encode_hunks(hunks) for hunks in szz_hunks] if self.__rank == 0 else None
+                szz_hunks = [ColumnarTransport.decode_hunks(transport.scatter(buffers))]
+
+            if szz_hunks is not None:
+                contributors = self.__fetch_blamed_commits(szz_hunks, git_repo)
+            busy = time.time() - start_blame
+        self.__log_load_balance("blame", busy, time.time() - start_blame)
+        return contributors
+
+    @staticmethod
+    def start(comm, *args, **kwargs):
+        """Entry point of each process of the processes backend."""
+        Szz(*args, comm=comm, **kwargs).run()
 
 
 if __name__ == '__main__':
-    help_message = 'Usage:\n SzzAlgorithm.py -r|--repo=<repo> -i|--issues=<issues_file> -o|--output=<output_folder> -l|--labels=<labels>'
+    help_message = 'Usage:\n SzzAlgorithm.py -r|--repo=<repo> -i|--issues=<issues_file> -o|--output=<output_folder> ' \
+                   '-l|--labels=<labels> [--backend=mpi|processes|serial] [--processes=<num_processes>] ' + \
+                   SzzOptions.usage(SzzOptions.RUN)
     repo = None
     issues = None
     out_dir = None
     labels = ['fix', 'bug-fix', 'retain']
+    backend = 'mpi'
+    num_processes = os.cpu_count()
+    szz_options = {}
 
     try:
         if not sys.argv[1:]:
             raise getopt.GetoptError('No arguments passed from the command line. See help instructions.')
-        opts, args = getopt.getopt(sys.argv[1:], "r:i:o:l:H", ["repo=", "issues=", "output=", "labels=", "help"])
+        opts, args = getopt.getopt(sys.argv[1:], "r:i:o:l:H", ["repo=", "issues=", "output=", "labels=", "backend=",
+                                                                 "processes=", "help"] +
+                                   SzzOptions.long_options(SzzOptions.RUN))
         for opt, arg in opts:
             if opt in ("-h", "--help"):
                 print(help_message)
@@ -532,9 +1149,16 @@ if __name__ == '__main__':
             elif opt in ("-o", "--output"):
                 out_dir = arg
             elif opt in ("-l", "--labels"):
-                labels = arg
-            else:
+                labels = [label for label in arg.split(',') if label]
+            elif opt == "--backend":
+                if arg not in ('mpi', 'processes', 'serial'):
+                    raise getopt.GetoptError('Invalid backend %s, expected mpi, processes or serial.' % arg)
+                backend = arg
+            elif opt == "--processes":
+                num_processes = int(arg)
+            elif not SzzOptions.parse(opt, arg, szz_options):
                 assert False, "unhandled option"
+        SzzOptions.validate(szz_options)
     except getopt.GetoptError as err:
         # print help information and exit:
         print(err)  # will print something like "option -a not recognized"
@@ -542,7 +1166,12 @@ if __name__ == '__main__':
         sys.exit(1)
 
     try:
-        szz = Szz(repo, issues, out_dir, labels)
-        szz.run()
+        if backend == 'processes':
+            LocalComm.spawn(num_processes, Szz.start, repo, issues, out_dir, labels, **szz_options)
+        else:
+            # the MPI communicator is created by Szz, so that mpi4py is imported only with the mpi backend
+            szz = Szz(repo, issues, out_dir, labels, comm=LocalComm.serial() if backend == 'serial' else None,
+                      **szz_options)
+            szz.run()
     except KeyboardInterrupt:
         log.error("Received Ctrl-C or another break signal. Exiting.")
@@ -0,0 +1,210 @@
+import os
+os.environ["OPENBLAS_NUM_THREADS"] = "1"
+
+import sys
+import getopt
+
+import heapq
+import logging
+import time
+
+from mpi4py import MPI
+from typing import List, Tuple
+
+import loggingcfg
+from activityclassifier import BasicFileTypeClassifier
+from szz.SzzAlgorithm import Szz
+from szz.SzzOptions import SzzOptions
+from utils import utility
+
+log = loggingcfg.initialize_logger('SZZ-BATCH', console_level=logging.INFO)
+
+
+class SzzBatch:
+    """
+    Runs SZZ on a list of projects within a single MPI job. Projects are scheduled by the size of their object store:
+    a project larger than the average share of a process gets a group of processes of its own, proportional to its
+    size, while the smaller ones are packed on the remaining processes, each running its projects one after another.
+    """
+    def __init__(self, project_file: str, repos_folder: str, issues_folder: str, output_folder: str,
+                 valid_labels: List[str], **szz_options):
+        self.__project_file = project_file
+        self.__repos_folder = repos_folder
+        self.__issues_folder = issues_folder
+        self.__output_folder = output_folder
+        self.__valid_labels = valid_labels
+        self.__szz_options = szz_options
+        self.__comm = MPI.COMM_WORLD
+        self.__rank = self.__comm.Get_rank()
+        self.__size = self.__comm.Get_size()
+
+    def __read_projects(self) -> List[Tuple[str, str, str]]:
+        """(slug, repo path, issues file path) of the projects in the list, skipping those missing locally."""
+        projects = []
+        with open(self.__project_file, 'r') as f:
+            for slug in f:
+                slug = slug.strip()
+                if not slug:
+                    continue
+                repo_path = os.path.join(self.__repos_folder, utility.slug_to_folder_name(slug))
+                issues_path = os.path.join(self.__issues_folder, slug.replace("/", "_") + "_issues.csv")
+                # the issues file in the output format is preferred to the csv one, when both exist
+                formatted_issues_path = utility.with_format(issues_path, self.__szz_options.get('output_format', 'csv'))
+                if os.path.exists(formatted_issues_path):
+                    issues_path = formatted_issues_path
+                if not os.path.isdir(repo_path):
+                    log.warning("Skipping %s, repository not found in %s", slug, repo_path)
+                elif not os.path.exists(issues_path):
+                    log.warning("Skipping %s, issues file not found in %s", slug, issues_path)
+                else:
+                    projects.append((slug, repo_path, issues_path))
+        return projects
+
+    @staticmethod
+    def __cost(repo_path: str) -> int:
+        """Size on disk of the object store of the repository, a proxy of the time needed to process it."""
+        objects_path = os.path.join(repo_path, ".git", "objects")
+        if not os.path.isdir(objects_path):
+            objects_path = os.path.join(repo_path, "objects")  # bare repository
+        size = 0
+        for folder, _, files in os.walk(objects_path):
+            for file_name in files:
+                try:
+                    size += os.path.getsize(os.path.join(folder, file_name))
+                except OSError:
+                    pass
+        return max(size, 1)
+
+    @staticmethod
+    def plan(costs: List[Tuple[int, int]], num_processes: int) -> List[Tuple[int, List[int]]]:
+        """
+        Splits the processes in groups given the (project index, cost) pairs. Returns, for each group,
+        its number of processes and the indexes of the projects it runs, in order of execution.
+        """
+        costs = sorted(costs, key=lambda c: (-c[1], c[0]))
+        share = sum(cost for _, cost in costs) / num_processes
+        large = [(index, cost, int(cost // share)) for index, cost in costs if cost >= 2 * share]
+        small = [(index, cost) for index, cost in costs if cost < 2 * share]
+
+        # leave at least one process for the small projects, taking it from the largest groups
+        sizes = [group_size for _, _, group_size in large]
+        while small and sizes and sum(sizes) >= num_processes:
+            i = sizes.index(max(sizes))
+            sizes[i] -= 1
+        while large and sum(sizes) > num_processes:
+            i = sizes.index(max(sizes))
+            sizes[i] -= 1
+        if not small:
+            # the processes left over by the rounding go to the largest groups
+            for i in range(num_processes - sum(sizes)):
+                sizes[i % len(sizes)] += 1
+
+        groups = []
+        for (index, cost, _), group_size in zip(large, sizes):
+            if group_size > 1:
+                groups.append((group_size, [index]))
+            else:
+                small.append((index, cost))
+
+        # longest processing time first: each small project goes to the least loaded process
+        num_single = num_processes - sum(group_size for group_size, _ in groups)
+        if num_single > 0:
+            singles = [(0, i, []) for i in range(num_single)]
+            for index, cost in sorted(small, key=lambda c: (-c[1], c[0])):
+                load, i, indexes = heapq.heappop(singles)
+                indexes.append(index)
+                heapq.heappush(singles, (load + cost, i, indexes))
+            groups.extend((1, indexes) for _, _, indexes in sorted(singles, key=lambda s: s[1]))
+        return groups
+
+    def run(self):
+        start = time.time()
+        plan = None
+        if self.__rank == 0:
+            projects = self.__read_projects()
+            costs = [(i, SzzBatch.__cost(repo_path)) for i, (_, repo_path, _) in enumerate(projects)]
+            groups = SzzBatch.plan(costs, self.__size) if projects else []
+            plan = []
+            for group_size, indexes in groups:
+                plan.append((group_size, [projects[i] for i in indexes]))
+                log.info("Group of %d processes runs %s", group_size, ", ".join(projects[i][0] for i in indexes))
+        plan = self.__comm.bcast(plan, root=0)
+
+        color = 0
+        first_rank = 0
+        for i, (group_size, _) in enumerate(plan):
+            if first_rank <= self.__rank < first_rank + group_size:
+                color = i
+                break
+            first_rank += group_size
+        else:
+            color = MPI.UNDEFINED
+        group_comm = self.__comm.Split(color, self.__rank)
+
+        if group_comm != MPI.COMM_NULL:
+            basic_classifier = BasicFileTypeClassifier()
+            for slug, repo_path, issues_path in plan[color][1]:
+                try:
+                    szz = Szz(repo_path, issues_path, self.__output_folder, self.__valid_labels,
+                              comm=group_comm, basic_classifier=basic_classifier, **self.__szz_options)
+                    szz.run()
+                except Exception:
+                    log.exception("Process %d failed processing %s", self.__rank, slug)
+                    if group_comm.Get_size() > 1:
+                        # the other processes of the group may be waiting for this one in a collective operation of
+                        # the project, so they could not go on to the next one: the whole job is stopped
+                        log.error("Aborting the job: %s failed in a group of %d processes", slug,
+                                  group_comm.Get_size())
+                        self.__comm.Abort(1)
+            group_comm.Free()
+
+        self.__comm.Barrier()
+        if self.__rank == 0:
+            log.info("Processed %d projects in %.2f seconds", sum(len(p) for _, p in plan), time.time() - start)
+
+
+if __name__ == '__main__':
+    help_message = 'Usage:\n SzzBatch.py -f|--from=<project_list> -r|--repos=<repos_folder> ' \
+                   '-i|--issues=<issues_folder> -o|--output=<output_folder> -l|--labels=<labels> ' + \
+                   SzzOptions.usage(SzzOptions.RUN)
+    project_file = None
+    repos = None
+    issues = None
+    out_dir = None
+    labels = ['fix', 'bug-fix', 'retain']
+    options = {}
+
+    try:
+        if not sys.argv[1:]:
+            raise getopt.GetoptError('No arguments passed from the command line. See help instructions.')
+        opts, args = getopt.getopt(sys.argv[1:], "f:r:i:o:l:H", ["from=", "repos=", "issues=", "output=", "labels=",
+                                                                   "help"] + SzzOptions.long_options(SzzOptions.RUN))
+        for opt, arg in opts:
+            if opt in ("-h", "--help"):
+                print(help_message)
+                sys.exit(0)
+            elif opt in ("-f", "--from"):
+                project_file = arg
+            elif opt in ("-r", "--repos"):
+                repos = arg
+            elif opt in ("-i", "--issues"):
+                issues = arg
+            elif opt in ("-o", "--output"):
+                out_dir = arg
+            elif opt in ("-l", "--labels"):
+                labels = [label for label in arg.split(',') if label]
+            elif not SzzOptions.parse(opt, arg, options):
+                assert False, "unhandled option"
+        if None in (project_file, repos, issues, out_dir):
+            raise getopt.GetoptError('Missing required arguments. See help instructions.')
+        SzzOptions.validate(options)
+    except getopt.GetoptError as err:
+        # print help information and exit:
+        print(err)  # will print something like "option -a not recognized"
+        print(help_message)
+        sys.exit(1)
+
+    try:
+        SzzBatch(project_file, repos, issues, out_dir, labels, **options).run()
+    except KeyboardInterrupt:
+        log.error("Received Ctrl-C or another break signal. Exiting.")
@@ -1,13 +1,15 @@
 class SzzCommit:
+    """Fixing commit and its first parent, kept as raw 20-byte ids and returned as hex shas."""
+    __slots__ = ('__oid', '__parent_oid')
+
     def __init__(self, sha: str, sha_parent: str):
-        self.__sha = sha
-        self.__sha_parent = sha_parent
+        self.__oid = bytes.fromhex(sha)
+        self.__parent_oid = bytes.fromhex(sha_parent)
 
     @property
     def sha(self):
-        return self.__sha
+        return self.__oid.hex()
 
     @property
     def sha_parent(self):
-        return self.__sha_parent
-
+        return self.__parent_oid.hex()
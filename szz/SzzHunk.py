@@ -1,12 +1,26 @@
+from typing import Dict
+
 from szz.SzzPatch import SzzPatch
 
 
 class SzzHunk:
-    def __init__(self, old_lines: int, old_start: int, patch: SzzPatch, line_labels):
+    """
+    Lines deleted by a fixing commit. Hunks are diffed without context, so each line of the range has a label, code (0)
+    or comment (1): the labels are kept as a bitmap of the comment lines, bit i for line old_start + i.
+    """
+    __slots__ = ('__old_lines', '__old_start', '__patch', '__comment_lines')
+
+    def __init__(self, old_lines: int, old_start: int, patch: SzzPatch, line_labels: Dict[int, int] = None,
+                 comment_lines: int = 0):
         self.__old_lines = old_lines
         self.__old_start = old_start
         self.__patch = patch
-        self.__line_labels = line_labels
+        if line_labels:
+            comment_lines = 0
+            for line_num, label in line_labels.items():
+                if label:
+                    comment_lines |= 1 << (line_num - old_start)
+        self.__comment_lines = comment_lines
 
     @property
     def old_lines(self):
@@ -19,7 +33,17 @@ class SzzHunk:
     @property
     def patch(self):
         return self.__patch
-    
+
     @property
-    def line_labels(self):
-        return self.__line_labels
+    def comment_lines(self) -> int:
+        return self.__comment_lines
+
+    @property
+    def line_labels(self) -> Dict[int, int]:
+        return {self.__old_start + i: (self.__comment_lines >> i) & 1 for i in range(self.__old_lines)}
+
+    def code_lines(self, first_line: int, last_line: int) -> int:
+        """Number of lines of code between the two lines of the hunk, both included."""
+        num_lines = last_line - first_line + 1
+        comments = (self.__comment_lines >> (first_line - self.__old_start)) & ((1 << num_lines) - 1)
+        return num_lines - bin(comments).count('1')
@@ -0,0 +1,104 @@
+import getopt
+from typing import Dict, List
+
+from gitutils.repo import RepoPreparer
+from szz.LineIndex import LineIndex
+from szz.WalkPartition import WalkPartition
+from szz.WalkScope import WalkScope
+from utils import utility
+
+
+class SzzOptions:
+    """
+    Command line options shared by the entry points of SZZ (SzzAlgorithm.py, SzzBatch.py and SzzPlanner.py). Each
+    entry point parses its own options (repository, projects, processes, ...) and hands the others to parse(), which
+    validates them into keyword arguments of Szz.
+    """
+    # options of a run, accepted by SzzAlgorithm.py and SzzBatch.py
+    RUN = ['schedule', 'batch-size', 'blame-cache', 'scratch-dir', 'incremental', 'checkpoint-interval', 'resume',
+           'no-merge', 'format', 'partition', 'blame-threads', 'blame-engine', 'prepare', 'libgit2-settings', 'since',
+           'until', 'paths']
+    # options of the blame engine and of the scope of the walk, accepted by the planner too
+    SCOPE = ['blame-engine', 'since', 'until', 'paths']
+    __USAGE = {'schedule': '--schedule=static|dynamic|pipelined', 'batch-size': '--batch-size=<num_hunks>',
+               'blame-cache': '--blame-cache', 'scratch-dir': '--scratch-dir=<node_local_dir>',
+               'incremental': '--incremental', 'checkpoint-interval': '--checkpoint-interval=<seconds>',
+               'resume': '--resume', 'no-merge': '--no-merge', 'format': '--format=csv|parquet',
+               'partition': '--partition=contiguous|hash|cost', 'blame-threads': '--blame-threads=<num_threads>',
+               'blame-engine': '--blame-engine=libgit2|index', 'prepare': '--prepare',
+               'libgit2-settings': '--libgit2-settings=<settings_file>', 'since': '--since=<date>',
+               'until': '--until=<date>', 'paths': '--paths=<path>[,<path>...]'}
+
+    @staticmethod
+    def usage(names: List[str]) -> str:
+        return ' '.join('[%s]' % SzzOptions.__USAGE[name] for name in names)
+
+    @staticmethod
+    def long_options(names: List[str]) -> List[str]:
+        """Long options as getopt expects them, followed by '=' if they take a value."""
+        return [name + '=' if '=' in SzzOptions.__USAGE[name] else name for name in names]
+
+    @staticmethod
+    def parse(opt: str, arg: str, options: Dict) -> bool:
+        """Adds a shared option to the keyword arguments of Szz. Returns False if it is not a shared option."""
+        if opt == "--schedule":
+            if arg not in ('static', 'dynamic', 'pipelined'):
+                raise getopt.GetoptError('Invalid schedule %s, expected static, dynamic or pipelined.' % arg)
+            options['schedule'] = arg
+        elif opt == "--batch-size":
+            options['batch_size'] = int(arg)
+        elif opt == "--blame-cache":
+            options['blame_cache'] = True
+        elif opt == "--scratch-dir":
+            options['scratch_dir'] = arg
+        elif opt == "--incremental":
+            options['incremental'] = True
+        elif opt == "--checkpoint-interval":
+            options['checkpoint_interval'] = float(arg)
+        elif opt == "--resume":
+            options['resume'] = True
+        elif opt == "--no-merge":
+            options['merge'] = False
+        elif opt == "--format":
+            if arg not in utility.FORMATS:
+                raise getopt.GetoptError('Invalid format %s, expected one of %s.' % (arg, ', '.join(utility.FORMATS)))
+            options['output_format'] = arg
+        elif opt == "--partition":
+            if arg not in WalkPartition.STRATEGIES:
+                raise getopt.GetoptError('Invalid partition %s, expected one of %s.' %
+                                         (arg, ', '.join(WalkPartition.STRATEGIES)))
+            options['partition'] = arg
+        elif opt == "--blame-threads":
+            options['blame_threads'] = int(arg)
+        elif opt == "--blame-engine":
+            if arg not in LineIndex.ENGINES:
+                raise getopt.GetoptError('Invalid blame engine %s, expected one of %s.' %
+                                         (arg, ', '.join(LineIndex.ENGINES)))
+            options['blame_engine'] = arg
+        elif opt == "--prepare":
+            options['prepare'] = True
+        elif opt == "--libgit2-settings":
+            try:
+                options['libgit2_settings'] = RepoPreparer.load_settings(arg)
+            except (OSError, ValueError) as e:
+                raise getopt.GetoptError('Invalid libgit2 settings file %s: %s' % (arg, e))
+        elif opt in ("--since", "--until"):
+            try:
+                options[opt[2:]] = WalkScope.parse_date(arg)
+            except ValueError:
+                raise getopt.GetoptError('Invalid date %s, expected an ISO 8601 date.' % arg)
+        elif opt == "--paths":
+            options['paths'] = [path for path in arg.split(',') if path]
+        else:
+            return False
+        return True
+
+    @staticmethod
+    def validate(options: Dict):
+        """Rejects the shared options that cannot be combined."""
+        if options.get('incremental') and options.get('merge') is False:
+            raise getopt.GetoptError('--incremental needs the merged output files of the previous run, '
+                                     'it cannot be combined with --no-merge.')
+        if options.get('incremental') and any(options.get(name) for name in ('since', 'until', 'paths')):
+            raise getopt.GetoptError('--incremental processes the history since the previous run, '
+                                     'it cannot be combined with --since, --until or --paths.')
@@ -1,9 +1,14 @@
+import sys
+
 from szz.SzzCommit import SzzCommit
 
 
 class SzzPatch:
+    """The path is interned, so that the patches of the same file share it."""
+    __slots__ = ('__old_file', '__label', '__commit')
+
     def __init__(self, old_file: str, label: int, commit: SzzCommit):
-        self.__old_file = old_file
+        self.__old_file = sys.intern(old_file)
         self.__label = label
         self.__commit = commit
 
@@ -18,4 +23,3 @@ class SzzPatch:
     @property
     def commit(self):
         return self.__commit
-
@@ -0,0 +1,257 @@
+import os
+os.environ["OPENBLAS_NUM_THREADS"] = "1"
+
+import sys
+import getopt
+
+import itertools
+import logging
+import math
+import resource
+import time
+import tracemalloc
+
+import pygit2
+
+from typing import Dict, List, Optional, Tuple
+
+import loggingcfg
+from activityclassifier import BasicFileTypeClassifier
+from githubutils.CommitWrapper import CommitWrapper
+from szz.CommitIndex import CommitIndex
+from szz.DiffAnalysis import DiffAnalysis
+from szz.LineIndex import LineIndex
+from szz.IssueTable import IssueTable
+from szz.SzzAlgorithm import Szz
+from szz.SzzHunk import SzzHunk
+from szz.SzzOptions import SzzOptions
+from szz.WalkScope import WalkScope
+
+log = loggingcfg.initialize_logger('SZZ-PLAN', console_level=logging.INFO)
+
+
+class SzzPlanner:
+    """
+    Predicts the time and the memory of an SZZ run before allocating nodes for it, from a sample of the history:
+    commits spread over the whole walk are processed as in the walk phase (timing them, counting the fixing commits
+    and their hunks), and a sample of their hunks is blamed. Times are extrapolated to the whole walk, and the memory of
+    rank 0 from the size of the commit index and of the hunks it gathers.
+    """
+    def __init__(self, repo_path: str, issues_file_path: str, valid_labels: List[str], sample_size: int = 200,
+                 blame_sample_size: int = 30, max_ranks: int = 64, blame_engine: str = LineIndex.LIBGIT2,
+                 since=None, until=None, paths=None):
+        self.__repo_path = repo_path
+        self.__issues_file_path = issues_file_path
+        self.__valid_labels = valid_labels
+        self.__sample_size = sample_size
+        self.__blame_sample_size = blame_sample_size
+        self.__max_ranks = max_ranks
+        self.__blame_engine = blame_engine
+        self.__line_index = LineIndex() if blame_engine == LineIndex.INDEX else None
+        self.__since = since
+        self.__until = until
+        self.__paths = paths
+        self.__scope = WalkScope(since, until, paths)
+        self.__basic_classifier = BasicFileTypeClassifier()
+        self.__issues_dict: IssueTable = None
+
+    def __closes_valid_issue(self, commit: CommitWrapper) -> bool:
+        """Same rules as the walk, with the same join against the issue table."""
+        issue_ids = [issue_id for _, ids in commit.issue_ids for issue_id in ids]
+        return bool(self.__issues_dict.links(issue_ids, [commit.authored_date.timestamp()] * len(issue_ids))[3].any())
+
+    def __inspect(self, git_repo: pygit2.Repository, pygit2_commit: pygit2.Commit, commit_index: CommitIndex,
+                  traced: bool) -> Tuple[CommitWrapper, Optional[List[SzzHunk]], int, int]:
+        """
+        Processes a commit with the methods of the walk, adding it to the commit index. Returns the commit, its hunks if
+        it is a fixing commit (None otherwise) and, if the allocations are traced, the bytes of its index entry and hunks.
+        """
+        commit = CommitWrapper(pygit2_commit)
+        hunks = None
+        index_bytes = 0
+        hunk_bytes = 0
+        diff = self.__scope.patches(commit.diff(git_repo)) if commit.parents else None
+        if diff:
+            diff_analysis = DiffAnalysis(self.__basic_classifier, diff)
+            db_commit = Szz.commit_wrapper_to_commit(commit, diff_analysis, {})
+            if not self.__scope.is_path_scoped:
+                before = tracemalloc.get_traced_memory()[0] if traced else 0
+                commit_index.add(db_commit, commit.message.split('\n')[0])
+                if traced:
+                    index_bytes = tracemalloc.get_traced_memory()[0] - before
+            if self.__closes_valid_issue(commit):
+                before = tracemalloc.get_traced_memory()[0] if traced else 0
+                hunks = Szz.fix_hunks(self.__basic_classifier, commit, diff_analysis)
+                if traced:
+                    hunk_bytes = tracemalloc.get_traced_memory()[0] - before
+        return commit, hunks, index_bytes, hunk_bytes
+
+    def __command_line(self, ranks: int) -> str:
+        """The run the predictions assume: with more than one process, the dynamic schedule hands out the blames."""
+        args = ['--repo=%s' % self.__repo_path, '--issues=%s' % self.__issues_file_path, '--output=<out_folder>',
+                '--labels=%s' % ','.join(self.__valid_labels)]
+        if ranks > 1:
+            args.append('--schedule=dynamic')
+        if self.__blame_engine != LineIndex.LIBGIT2:
+            args.append('--blame-engine=%s' % self.__blame_engine)
+        if self.__since is not None:
+            args.append('--since=%s' % self.__since.isoformat())
+        if self.__until is not None:
+            args.append('--until=%s' % self.__until.isoformat())
+        if self.__paths:
+            args.append('--paths=%s' % ','.join(self.__paths))
+        command = 'python szz/SzzAlgorithm.py ' + ' '.join(args)
+        return 'mpiexec -n %d %s' % (ranks, command) if ranks > 1 else command
+
+    def plan(self) -> Dict[str, float]:
+        # every process starts the interpreter, imports the libraries, loads the issues and opens the repository
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        start = time.time()
+        self.__issues_dict = IssueTable.load(self.__issues_file_path, self.__valid_labels)
+        git_repo = pygit2.Repository(self.__repo_path)
+        setup_time = usage.ru_utime + usage.ru_stime + time.time() - start
+        # memory of each process before the walk: interpreter, libraries, issues and repository handle
+        base_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+        start = time.time()
+        walker = git_repo.walk(git_repo[git_repo.head.target].id, pygit2.GIT_SORT_TIME)
+        walk = [commit for commit in itertools.takewhile(lambda commit: not self.__scope.past_window(commit), walker)
+                if self.__scope.in_window(commit)]
+        list_time = time.time() - start
+        num_commits = len(walk)
+        step = max(1, num_commits // self.__sample_size)
+        sample = walk[::step][:self.__sample_size]
+
+        # the sample is timed without tracing the memory allocations, which slows the interpreter down
+        commit_times = []
+        num_fixes = 0
+        num_hunks = 0
+        groups = []
+        commit_index = CommitIndex()
+        for pygit2_commit in sample:
+            commit_start = time.time()
+            commit, hunks, _, _ = self.__inspect(git_repo, pygit2_commit, commit_index, False)
+            if hunks is not None:
+                num_fixes += 1
+                num_hunks += len(hunks)
+                fix_groups = {}
+                for hunk in hunks:
+                    fix_groups.setdefault(hunk.patch.old_file, []).append(hunk)
+                groups += [(old_file, commit.parents[0].hex, min(h.old_start for h in group),
+                            max(h.old_start + h.old_lines - 1 for h in group))
+                           for old_file, group in fix_groups.items()]
+            commit_times.append(time.time() - commit_start)
+
+        # then the memory taken by the index entries and the hunks is measured in a second pass
+        index_bytes = 0
+        hunk_bytes = 0
+        commit_index = CommitIndex()
+        tracemalloc.start()
+        for pygit2_commit in sample:
+            _, _, commit_index_bytes, commit_hunk_bytes = self.__inspect(git_repo, pygit2_commit, commit_index, True)
+            index_bytes += commit_index_bytes
+            hunk_bytes += commit_hunk_bytes
+        tracemalloc.stop()
+
+        blame_times = []
+        for path, sha_parent, min_line, max_line in groups[::max(1, len(groups) // self.__blame_sample_size)][
+                                                     :self.__blame_sample_size]:
+            blame_start = time.time()
+            try:
+                if self.__line_index is not None:
+                    self.__line_index.blame(git_repo, path, sha_parent, min_line, max_line)
+                else:
+                    git_repo.blame(path, newest_commit=sha_parent, min_line=min_line, max_line=max_line)
+            except Exception as e:
+                log.warning("Blame of %s at %s failed: %s", path, sha_parent, e)
+                continue
+            blame_times.append(time.time() - blame_start)
+
+        sampled = max(len(sample), 1)
+        fix_ratio = num_fixes / sampled
+        predicted_fixes = fix_ratio * num_commits
+        predicted_hunks = predicted_fixes * (num_hunks / num_fixes if num_fixes else 0)
+        predicted_groups = predicted_fixes * (len(groups) / num_fixes if num_fixes else 0)
+        walk_time = num_commits * sum(commit_times) / sampled
+        blame_time = predicted_groups * (sum(blame_times) / len(blame_times) if blame_times else 0)
+        longest_task = max(commit_times + blame_times + [0])
+        # rank 0 gathers the commit index and all the hunks, which it hands out
+        rank0_memory = base_memory + num_commits * index_bytes / sampled + \
+                       predicted_hunks * (hunk_bytes / num_hunks if num_hunks else 0)
+
+        def wall_time(ranks):
+            # every process lists the walk; with more than one process, rank 0 hands out the blame batches, as with
+            # --schedule=dynamic (the static schedule splits the hunks in equal slices, whatever they cost)
+            return setup_time + list_time + walk_time / ranks + blame_time / max(ranks - 1, 1)
+
+        # the most processes still used at least half of the time, each with more work than the longest task
+        recommended = 1
+        for ranks in range(2, self.__max_ranks + 1):
+            efficiency = wall_time(1) / (ranks * wall_time(ranks))
+            if efficiency < 0.5 or (walk_time + blame_time) / ranks < longest_task:
+                break
+            recommended = ranks
+
+        log.info("Commits to walk: %d, sampled: %d", num_commits, len(sample))
+        log.info("Fixing commits: %.1f%% of the sample, about %d in the walk", fix_ratio * 100, predicted_fixes)
+        log.info("Hunks per fixing commit: %.1f, about %d hunks in %d blame calls",
+                 num_hunks / num_fixes if num_fixes else 0, predicted_hunks, predicted_groups)
+        log.info("Blame time per call: %.1f [ms] (%d calls sampled)",
+                 1000 * sum(blame_times) / len(blame_times) if blame_times else 0, len(blame_times))
+        log.info("Predicted walk time: %.1f [s], blame time: %.1f [s] (on a single process)", walk_time, blame_time)
+        log.info("Predicted memory: %.0f [MB] per process, %.0f [MB] peak on rank 0", base_memory / 2 ** 20,
+                 rank0_memory / 2 ** 20)
+        for ranks in [2 ** i for i in range(int(math.log2(self.__max_ranks)) + 1)]:
+            log.info("Predicted time with %d processes: %.1f [s]", ranks, wall_time(ranks))
+        log.info("Recommended number of processes: %d (about %.1f [s]), with: %s", recommended, wall_time(recommended),
+                 self.__command_line(recommended))
+        return {"num_commits": num_commits, "fix_ratio": fix_ratio, "hunks": predicted_hunks,
+                "walk_time": walk_time, "blame_time": blame_time, "rank0_memory": rank0_memory,
+                "recommended_ranks": recommended, "command_line": self.__command_line(recommended)}
+
+
+if __name__ == '__main__':
+    help_message = 'Usage:\n SzzPlanner.py -r|--repo=<repo_path> -i|--issues=<issue_file_path> [-l|--labels=<labels>] ' \
+                   '[--sample=<num_commits>] [--blame-sample=<num_blame_calls>] [--max-processes=<num_processes>] ' + \
+                   SzzOptions.usage(SzzOptions.SCOPE)
+    repo = None
+    issues = None
+    labels = ['fix', 'bug-fix', 'retain']
+    options = {}
+
+    try:
+        if not sys.argv[1:]:
+            raise getopt.GetoptError('No arguments passed from the command line. See help instructions.')
+        opts, args = getopt.getopt(sys.argv[1:], "r:i:l:H", ["repo=", "issues=", "labels=", "sample=", "blame-sample=",
+                                                            "max-processes=", "help"] +
+                                   SzzOptions.long_options(SzzOptions.SCOPE))
+        for opt, arg in opts:
+            if opt in ("-h", "--help"):
+                print(help_message)
+                sys.exit(0)
+            elif opt in ("-r", "--repo"):
+                repo = arg
+            elif opt in ("-i", "--issues"):
+                issues = arg
+            elif opt in ("-l", "--labels"):
+                labels = [label for label in arg.split(',') if label]
+            elif opt == "--sample":
+                options['sample_size'] = int(arg)
+            elif opt == "--blame-sample":
+                options['blame_sample_size'] = int(arg)
+            elif opt == "--max-processes":
+                options['max_ranks'] = int(arg)
+            elif not SzzOptions.parse(opt, arg, options):
+                assert False, "unhandled option"
+        if None in (repo, issues):
+            raise getopt.GetoptError('Missing required arguments. See help instructions.')
+    except getopt.GetoptError as err:
+        # print help information and exit:
+        print(err)  # will print something like "option -a not recognized"
+        print(help_message)
+        sys.exit(1)
+
+    try:
+        SzzPlanner(repo, issues, labels, **options).plan()
+    except KeyboardInterrupt:
+        log.error("Received Ctrl-C or another break signal. Exiting.")
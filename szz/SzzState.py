@@ -0,0 +1,58 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Set, Tuple
+
+from szz.Issue import Issue
+
+
+class SzzState:
+    """
+    What an incremental run needs to know about the previous one: the HEAD commit it stopped at,
+    a fingerprint of each issue it saw, and the issue ids referenced by the messages of the commits it walked.
+    """
+    def __init__(self, head: str = None, issues: Dict[str, str] = None, references: Dict[str, List[str]] = None):
+        self.__head = head
+        self.__issues = issues if issues is not None else {}
+        self.__references = references if references is not None else {}
+
+    @property
+    def head(self):
+        return self.__head
+
+    @staticmethod
+    def __fingerprint(issue: Issue) -> str:
+        return hashlib.md5(bytes("{0}|{1}|{2}|{3}".format(issue.created_at, issue.closed_at, issue.labels,
+                                                          issue.is_pl), "utf8")).hexdigest()
+
+    def changed_issues(self, issues_dict: Dict[int, Issue]) -> Set[int]:
+        """Issues that are new, or whose dates, labels or type changed since the previous run."""
+        return {number for number, issue in issues_dict.items()
+                if self.__issues.get(str(number)) != SzzState.__fingerprint(issue)}
+
+    def commits_referencing(self, issue_numbers: Set[int]) -> Set[str]:
+        shas = set()
+        for number in issue_numbers:
+            shas.update(self.__references.get(str(number), []))
+        return shas
+
+    def update(self, head: str, issues_dict: Dict[int, Issue], issue_refs: List[Tuple[str, List[int]]]):
+        self.__head = head
+        self.__issues = {str(number): SzzState.__fingerprint(issue) for number, issue in issues_dict.items()}
+        for sha, issue_ids in issue_refs:
+            for issue_id in issue_ids:
+                shas = self.__references.setdefault(str(issue_id), [])
+                if sha not in shas:
+                    shas.append(sha)
+
+    def save(self, file_path: str):
+        with open(file_path, 'w') as f:
+            json.dump({'head': self.__head, 'issues': self.__issues, 'references': self.__references}, f)
+
+    @staticmethod
+    def load(file_path: str) -> 'SzzState':
+        if not os.path.exists(file_path):
+            return SzzState()
+        with open(file_path, 'r') as f:
+            state = json.load(f)
+        return SzzState(state.get('head'), state.get('issues'), state.get('references'))
@@ -0,0 +1,64 @@
+import heapq
+import math
+from typing import List
+
+import pygit2
+
+from githubutils.CommitWrapper import CommitWrapper
+
+
+class WalkPartition:
+    """
+    Assigns the commits of the walk to the processes. The walk is sorted by time, and recent history is usually
+    denser than the early one (bigger diffs, more fixing commits), so contiguous slices give most of the work to the
+    processes that get the most recent commits. Commits can instead be interleaved by the hash of their sha, or
+    assigned so that the processes get the same estimated cost.
+    """
+    CONTIGUOUS = 'contiguous'
+    HASH = 'hash'
+    COST = 'cost'
+    STRATEGIES = [CONTIGUOUS, HASH, COST]
+
+    @staticmethod
+    def estimate_cost(git_repo: pygit2.Repository, commit: pygit2.Commit) -> int:
+        """
+        Cheap estimate of the cost of processing a commit: the number of files changed with respect to its first
+        parent, from the tree diff only, counted twice when the message references an issue, since then the lines
+        of the hunks are classified too.
+        """
+        if not commit.parents:
+            return 1
+        num_files = len(git_repo.diff(commit.parents[0], commit))
+        if CommitWrapper(commit).issue_ids:
+            num_files *= 2
+        return 1 + num_files
+
+    @staticmethod
+    def contiguous(walk_size: int, size: int) -> List[int]:
+        """Rank of each commit, in slices of consecutive commits."""
+        dividend = math.ceil(walk_size / size) if walk_size else 1
+        return [min(i // dividend, size - 1) for i in range(walk_size)]
+
+    @staticmethod
+    def hashed(shas: List[str], size: int) -> List[int]:
+        """Rank of each commit, from its sha: deterministic and without any cost estimate."""
+        return [int(sha[:8], 16) % size for sha in shas]
+
+    @staticmethod
+    def balanced(costs: List[int], size: int) -> List[int]:
+        """Rank of each commit, assigning the most expensive ones first to the least loaded process."""
+        ranks = [0] * len(costs)
+        loads = [(0, rank) for rank in range(size)]
+        for i in sorted(range(len(costs)), key=lambda i: (-costs[i], i)):
+            load, rank = heapq.heappop(loads)
+            ranks[i] = rank
+            heapq.heappush(loads, (load + costs[i], rank))
+        return ranks
+
+    @staticmethod
+    def loads(ranks: List[int], costs: List[int], size: int) -> List[int]:
+        """Total cost assigned to each process."""
+        loads = [0] * size
+        for rank, cost in zip(ranks, costs):
+            loads[rank] += cost
+        return loads
@@ -0,0 +1,67 @@
+import fnmatch
+from datetime import datetime, timezone
+from typing import List
+
+import pygit2
+
+
+class WalkScope:
+    """
+    Restricts a run to the commits authored in a date range and to the files matching a list of paths, so that its
+    cost depends on the size of the window rather than of the repository. Paths are path prefixes or glob patterns,
+    those starting with '!' are excluded. Only the matching files of the commits in the window are diffed, and their
+    hunks are still blamed through the whole history.
+    """
+
+    def __init__(self, since: datetime = None, until: datetime = None, paths: List[str] = None):
+        self.__since = since.timestamp() if since is not None else None
+        self.__until = until.timestamp() if until is not None else None
+        paths = paths or []
+        self.__includes = [path.rstrip('/') for path in paths if not path.startswith('!')]
+        self.__excludes = [path[1:].rstrip('/') for path in paths if path.startswith('!')]
+
+    @staticmethod
+    def parse_date(value: str) -> datetime:
+        """ISO 8601 date or date and time, in UTC unless an offset is given."""
+        date = datetime.fromisoformat(value)
+        return date if date.tzinfo is not None else date.replace(tzinfo=timezone.utc)
+
+    @property
+    def scoped(self) -> bool:
+        return self.__since is not None or self.__until is not None or self.is_path_scoped
+
+    @property
+    def is_path_scoped(self) -> bool:
+        return bool(self.__includes or self.__excludes)
+
+    def past_window(self, commit: pygit2.Commit) -> bool:
+        """
+        True if the walk by time has gone past the start of the window: commits are sorted by commit date, which
+        is not earlier than the author date (unless clocks were off), so no older commit can be in the window.
+        """
+        return self.__since is not None and commit.commit_time < self.__since
+
+    def in_window(self, commit: pygit2.Commit) -> bool:
+        """True if the commit was authored in the date range, the start included and the end excluded."""
+        author_time = commit.author.time
+        return (self.__since is None or author_time >= self.__since) and \
+               (self.__until is None or author_time < self.__until)
+
+    def matches(self, path: str) -> bool:
+        if self.__includes and not any(WalkScope.__match(path, pattern) for pattern in self.__includes):
+            return False
+        return not any(WalkScope.__match(path, pattern) for pattern in self.__excludes)
+
+    def patches(self, diff: pygit2.Diff):
+        """
+        Patches of the files matching the paths. The deltas come from the tree diff, the lines of a file are only
+        diffed when its patch is generated, so the other files are never read.
+        """
+        if not self.is_path_scoped:
+            return diff
+        return [diff[i] for i, delta in enumerate(diff.deltas)
+                if self.matches(delta.new_file.path) or self.matches(delta.old_file.path)]
+
+    @staticmethod
+    def __match(path: str, pattern: str) -> bool:
+        return path == pattern or path.startswith(pattern + '/') or fnmatch.fnmatchcase(path, pattern)
@@ -0,0 +1,140 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import pygit2
+
+from szz.LineIndex import LineIndex
+
+# words of the paragraphs of the file: each line is unique, and paragraphs are separated by blank lines
+WORDS = ['value', 'commit', 'file', 'version']
+
+
+def libgit2_blame(git_repo: pygit2.Repository, path: str, sha: str, num_lines: int):
+    """Blamed sha of each line: libgit2 may split a run of lines from the same commit into several hunks."""
+    return [str(blame_hunk.orig_commit_id)
+            for blame_hunk in git_repo.blame(path, newest_commit=sha, min_line=1, max_line=num_lines)
+            for _ in range(blame_hunk.lines_in_hunk)]
+
+
+def index_blame(line_index: LineIndex, git_repo: pygit2.Repository, path: str, sha: str, num_lines: int):
+    return [blamed_sha for blamed_sha, _, lines in line_index.blame(git_repo, path, sha, 1, num_lines)
+            for _ in range(lines)]
+
+
+class LineIndexTest(unittest.TestCase):
+    """The index engine blames every revision of a file like libgit2 blame."""
+
+    def setUp(self):
+        self.repo_path = tempfile.mkdtemp()
+        self.git_repo = pygit2.init_repository(self.repo_path)
+        self.time = 1500000000
+
+    def tearDown(self):
+        shutil.rmtree(self.repo_path)
+
+    def commit(self, files, parents):
+        tree_builder = self.git_repo.TreeBuilder()
+        for path, lines in files.items():
+            tree_builder.insert(path, self.git_repo.create_blob('\n'.join(lines) + '\n'), pygit2.GIT_FILEMODE_BLOB)
+        self.time += 3600
+        signature = pygit2.Signature('Dev', 'dev@example.org', self.time, 0)
+        return self.git_repo.create_commit(None, signature, signature, 'commit %d' % self.time,
+                                           tree_builder.write(), parents)
+
+    @staticmethod
+    def paragraph(rng: random.Random):
+        return ['%s %d' % (rng.choice(WORDS), rng.randrange(10 ** 6)) for _ in range(rng.randint(1, 6))]
+
+    @staticmethod
+    def edit(rng: random.Random, paragraphs, num_edits: int):
+        """Rewrites, adds or removes paragraphs, mostly near the start of the file as a README is edited."""
+        paragraphs = list(paragraphs)
+        for _ in range(num_edits):
+            position = rng.randrange(5) if rng.random() < 0.8 else rng.randrange(len(paragraphs))
+            operation = rng.random()
+            if operation < 0.6:
+                paragraphs[position] = LineIndexTest.paragraph(rng)
+            elif operation < 0.8:
+                paragraphs.insert(position, LineIndexTest.paragraph(rng))
+            else:
+                del paragraphs[position]
+        return paragraphs
+
+    @staticmethod
+    def lines(paragraphs):
+        return [line for paragraph in paragraphs for line in paragraph + ['']]
+
+    def test_same_blame_as_libgit2(self):
+        """
+        A file of a few thousand lines, with a blank line after each paragraph, edited in branches merged back and
+        renamed: the blank lines must be paired with the same old lines as blame pairs them, which depends on the
+        common tail blame leaves out of its diffs.
+        """
+        rng = random.Random(0)
+        path = 'README.md'
+        paragraphs = [LineIndexTest.paragraph(rng) for _ in range(150)]
+        head = self.commit({path: self.lines(paragraphs)}, [])
+        revisions = [(path, head)]
+        for step in range(60):
+            if step == 30:
+                self.commit({}, [])  # unrelated root, to check the file is only looked up where it exists
+                new_path = 'README.rst'
+                head = self.commit({new_path: self.lines(paragraphs)}, [head])
+                path = new_path
+            elif step % 10 == 5:
+                # a branch and the main line both change the file, then the branch is merged
+                branch_paragraphs = self.edit(rng, paragraphs, 2)
+                branch = self.commit({path: self.lines(branch_paragraphs)}, [head])
+                paragraphs = self.edit(rng, paragraphs, 2)
+                head = self.commit({path: self.lines(paragraphs)}, [head])
+                paragraphs = paragraphs[:2] + branch_paragraphs[2:]
+                head = self.commit({path: self.lines(paragraphs)}, [head, branch])
+            elif step % 10 == 8:
+                # a merge of a branch not changing the file
+                branch = self.commit({path: self.lines(paragraphs)}, [head])
+                head = self.commit({path: self.lines(paragraphs)}, [head, branch])
+            else:
+                paragraphs = self.edit(rng, paragraphs, rng.randint(1, 3))
+                head = self.commit({path: self.lines(paragraphs)}, [head])
+            revisions.append((path, head))
+
+        line_index = LineIndex()
+        for path, commit_id in revisions:
+            num_lines = len(self.git_repo[commit_id].tree[path].data.decode().splitlines())
+            self.assertEqual(libgit2_blame(self.git_repo, path, str(commit_id), num_lines),
+                             index_blame(line_index, self.git_repo, path, str(commit_id), num_lines))
+
+    @unittest.skipUnless(os.environ.get('SZZ_BLAME_TEST_REPO'), 'set SZZ_BLAME_TEST_REPO=<repository>[:<paths>]')
+    def test_same_blame_as_libgit2_on_repository(self):
+        """Every revision of the given files of a real repository (the most changed file by default)."""
+        repo_path, _, paths = os.environ['SZZ_BLAME_TEST_REPO'].partition(':')
+        git_repo = pygit2.Repository(repo_path)
+        walk = list(git_repo.walk(git_repo.head.target, pygit2.GIT_SORT_TIME | pygit2.GIT_SORT_REVERSE))
+        if paths:
+            paths = paths.split(',')
+        else:
+            changes = {}
+            for commit in walk:
+                if len(commit.parents) == 1:
+                    for delta in git_repo.diff(commit.parents[0], commit).deltas:
+                        changes[delta.new_file.path] = changes.get(delta.new_file.path, 0) + 1
+            paths = [max(changes, key=changes.get)]
+        line_index = LineIndex()
+        for path in paths:
+            for commit in walk:
+                try:
+                    data = commit.tree[path].data
+                except KeyError:
+                    continue
+                num_lines = data.count(b'\n') + (0 if data.endswith(b'\n') else 1) if data else 0
+                if num_lines:
+                    self.assertEqual(libgit2_blame(git_repo, path, str(commit.id), num_lines),
+                                     index_blame(line_index, git_repo, path, str(commit.id), num_lines),
+                                     '%s at %s' % (path, commit.id))
+
+
+if __name__ == '__main__':
+    unittest.main()
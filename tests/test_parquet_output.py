@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+import pygit2
+
+from szz.LocalComm import LocalComm
+from szz.SzzAlgorithm import Szz
+from utils import utility
+
+# columns of the outputs holding numbers or timestamps, by output file
+NUMERIC_COLUMNS = {
+    "commits": ["NUM_PARENTS", "NUM_ADDITIONS", "NUM_DELETIONS", "NUM_FILES_CHANGED", "SRC_LOC_ADDED",
+                "SRC_LOC_DELETED", "NUM_SRC_FILES_TOUCHED"],
+    "commit_files": ["LOC_INS", "LOC_DEL", "LANG"],
+    "issue_links": ["LINE_NUM", "ISSUE_NUMBER", "DELTA_OPEN", "DELTA_COLSED"],
+    "blames_commit": ["TYPE", "NUM_BLAMED_LINES"],
+    "blamed_commit": ["NUM_PARENTS", "NUM_ADDITIONS", "NUM_DELETIONS", "NUM_FILES_CHANGED", "SRC_LOC_ADDED",
+                      "SRC_LOC_DELETED", "NUM_SRC_FILES_TOUCHED"],
+}
+
+
+class ParquetOutputTest(unittest.TestCase):
+    """The Parquet outputs of a run are read back with numeric columns, as the following steps compare them."""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.repo_path = os.path.join(self.folder, "owner_____proj")
+        self.output_folder = os.path.join(self.folder, "out")
+        os.makedirs(self.output_folder)
+        git_repo = pygit2.init_repository(self.repo_path)
+        lines = ["x_%d = %d" % (i, i) for i in range(20)]
+        parents = []
+        for day, message, changed in [(1, "initial", {}), (2, "feature", {5: "x_5 = 55"}),
+                                      (3, "Fix #1 wrong value", {5: "x_5 = 0"})]:
+            lines = [changed.get(i, line) for i, line in enumerate(lines)]
+            tree_builder = git_repo.TreeBuilder()
+            tree_builder.insert("a.py", git_repo.create_blob("\n".join(lines) + "\n"), pygit2.GIT_FILEMODE_BLOB)
+            signature = pygit2.Signature("Dev %d" % day, "dev%d@example.org" % day, 1577836800 + day * 86400, 0)
+            commit_id = git_repo.create_commit("refs/heads/master", signature, signature, message,
+                                               tree_builder.write(), parents)
+            parents = [commit_id]
+        self.issues_path = os.path.join(self.folder, "issues.csv")
+        pd.DataFrame([[1, "bug", "2019-12-01 00:00:00", "2020-02-01 00:00:00", "", False]],
+                     columns=["NUMBER", "TITLE", "CREATED_AT", "CLOSED_AT", "LABELS", "IS_PL"]).to_csv(
+            self.issues_path, index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_numeric_columns_round_trip(self):
+        Szz(self.repo_path, self.issues_path, self.output_folder, ["fix"], output_format="parquet",
+            comm=LocalComm.serial()).run()
+        for output, columns in NUMERIC_COLUMNS.items():
+            df = utility.read_table(os.path.join(self.output_folder, "owner_proj_%s.parquet" % output))
+            self.assertTrue(len(df), output)
+            for column in columns:
+                self.assertTrue(pd.api.types.is_numeric_dtype(df[column]),
+                                "%s.%s is %s" % (output, column, df[column].dtype))
+            if "TIMESTAMP" in df:
+                self.assertTrue(pd.api.types.is_datetime64_any_dtype(df["TIMESTAMP"]), output)
+        blames = utility.read_table(os.path.join(self.output_folder, "owner_proj_blames_commit.parquet"))
+        # as compared by the export of the results
+        self.assertEqual([0], blames["TYPE"].tolist())
+        self.assertEqual(1, blames["NUM_BLAMED_LINES"].sum())
+
+
+if __name__ == '__main__':
+    unittest.main()
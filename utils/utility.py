@@ -1,8 +1,16 @@
 import os, stat
 import shutil
+import csv
+import itertools
 import pandas as pd
 import glob
-from typing import List
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List
+
+# output formats of the pipeline artifacts
+FORMATS = ['csv', 'parquet']
+PARQUET_COMPRESSION = 'zstd'
+PARQUET_BATCH_SIZE = 10000
 
 
 def slug_to_folder_name(slug):
@@ -37,8 +45,89 @@ def __remove_readonly(func, path, _):
     func(path)
 
 
-def read_from_folder(input_dir_path: str, pattern: str = "*.csv", usecols: List = None) -> pd.DataFrame:
+def with_format(file_name: str, file_format: str = 'csv') -> str:
+    """Replaces the .csv extension of a file name (or of a glob pattern) with the one of the given format."""
+    if file_name.endswith(".csv"):
+        return file_name[:-len("csv")] + file_format
+    return file_name
+
+
+def read_table(file_path: str, usecols: List = None, dtype=None) -> pd.DataFrame:
+    """Reads a csv or parquet file, according to its extension. Parquet files are read with their own types."""
+    if file_path.endswith(".parquet"):
+        return pd.read_parquet(file_path, columns=usecols)
+    return pd.read_csv(file_path, index_col=False, na_filter=False, usecols=usecols, dtype=dtype)
+
+
+def write_table(df: pd.DataFrame, file_path: str):
+    """Writes a data frame to a csv or parquet file, according to its extension."""
+    if file_path.endswith(".parquet"):
+        df.to_parquet(file_path, index=False, compression=PARQUET_COMPRESSION)
+    else:
+        df.to_csv(file_path, index=False)
+
+
+def read_from_folder(input_dir_path: str, pattern: str = "*.csv", usecols: List = None,
+                     file_format: str = 'csv') -> pd.DataFrame:
     def df_from_each_file(f):
-        return pd.read_csv(f, index_col=False, na_filter=False, usecols=usecols)
-    return pd.concat(map(df_from_each_file, glob.glob(os.path.join(input_dir_path, pattern))), sort=False)
+        return read_table(f, usecols=usecols)
+    return pd.concat(map(df_from_each_file, glob.glob(os.path.join(input_dir_path, with_format(pattern, file_format)))),
+                     sort=False)
+
+
+__PARQUET_CONVERTERS = {'int': int, 'float': float, 'bool': lambda value: value == 'True',
+                        'timestamp': datetime.fromisoformat}
+
+
+def __parquet_type(column_type: str):
+    import pyarrow as pa
+    return {'int': pa.int64(), 'float': pa.float64(), 'bool': pa.bool_(),
+            'timestamp': pa.timestamp('us', tz='UTC')}.get(column_type, pa.string())
+
+
+def write_rows(file_path: str, columns: List[str], rows: Iterable[List[str]], column_types: Dict[str, str] = None):
+    """
+    Writes a stream of rows of string values to a csv or parquet file, according to its extension.
+    Parquet files are written in batches; the columns in column_types are stored as 'int', 'float', 'bool'
+    or 'timestamp' values, empty strings becoming nulls, and the others as strings.
+    """
+    if not file_path.endswith(".parquet"):
+        with open(file_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(columns)
+            writer.writerows(rows)
+        return
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    column_types = [(column_types or {}).get(column) for column in columns]
+    schema = pa.schema([(column, __parquet_type(column_type)) for column, column_type in zip(columns, column_types)])
+    rows = iter(rows)
+    with pq.ParquetWriter(file_path, schema, compression=PARQUET_COMPRESSION) as writer:
+        while True:
+            batch = list(itertools.islice(rows, PARQUET_BATCH_SIZE))
+            if not batch:
+                break
+            arrays = []
+            for values, column_type, field in zip(zip(*batch), column_types, schema):
+                convert = __PARQUET_CONVERTERS.get(column_type)
+                if convert is not None:
+                    values = [None if value == '' else convert(value) for value in values]
+                arrays.append(pa.array(values, type=field.type))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+
+def read_rows(file_path: str) -> Iterator[List[str]]:
+    """Reads the rows of a csv or parquet file as lists of strings, formatted as write_rows expects them."""
+    if not file_path.endswith(".parquet"):
+        with open(file_path, newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            next(reader, None)  # header
+            yield from reader
+        return
+
+    import pyarrow.parquet as pq
+    for batch in pq.ParquetFile(file_path).iter_batches(batch_size=PARQUET_BATCH_SIZE):
+        for row in zip(*(column.to_pylist() for column in batch.columns)):
+            yield ['' if value is None else str(value) for value in row]
 